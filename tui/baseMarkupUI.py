@@ -101,6 +101,9 @@ class BaseMarkupUI(object):
         self.timeLabel = QtWidgets.QLabel(self.centralwidget)
         self.timeLabel.setObjectName("timeLabel")
         self.timeControlLayout.addWidget(self.timeLabel)
+        self.fpsLabel = QtWidgets.QLabel(self.centralwidget) # Achieved frame rate while animating
+        self.fpsLabel.setObjectName("fpsLabel")
+        self.timeControlLayout.addWidget(self.fpsLabel)
         self.leftPanelLayout.addLayout(self.timeControlLayout)
         
         self.mainLayout.addLayout(self.leftPanelLayout, 0, 0, 1, 1)
@@ -327,6 +330,7 @@ class BaseMarkupUI(object):
         # Common translations
         self.label_3.setText(_translate("BASEUI", "Time"))
         self.timeLabel.setText(_translate("BASEUI", "0/0 [0.0]"))
+        self.fpsLabel.setText(_translate("BASEUI", ""))
         self.imageManipulationGroupBox.setTitle(_translate("BASEUI", "Image manipulation"))
         self.markupGroupBox.setTitle(_translate("BASEUI", "Image markup"))
         self.markupModeLabel.setText(_translate("BASEUI", "Markup Mode:"))
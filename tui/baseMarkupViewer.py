@@ -11,12 +11,20 @@ Base viewer class for common functionality between 2D and 3D viewers.
 
 import logging
 import os
+import threading
+import time
 import vtk
 import numpy as np
 from ngawari import fIO
 from ngawari import vtkfilters
-import spydcmtk
 from tui import tuiMarkups
+from tui import tuiFrameStore
+from tui import tuiStats
+from tui import tuiMemmap
+from tui import tuiPlayback
+from tui import tuiRender
+from tui import tuiUtils
+from tui import tuiCoordinates
 from tui.tuiUtils import dialogGetName
 
 logger = logging.getLogger(__name__)
@@ -42,11 +50,23 @@ class BaseMarkupViewer:
     def __init__(self):
         # Common defaults
         self.vtiDict = None
-        self.patientMeta = spydcmtk.dcmVTKTK.PatientMeta()
+        self.lazyLoading = True # Read PVD timesteps on demand
+        self.frameCacheBytes = tuiFrameStore.DEFAULT_CACHE_BYTES
+        self.framePrefetcher = None
+        self.streamLoading = True # If not lazy: show first timestep, read the rest in the background
+        self.frameStreamer = None
+        self.streamTimer = None
+        self.dtypePolicy = tuiUtils.DTYPE_NATIVE # 'native', 'float32' or 'float64'
+        self.useDicomCache = True # Sidecar cache of parsed DICOM directories
+        self.memmapBackend = True # Memory map uncompressed VTI / MHA / NIfTI voxels (a dtypePolicy cast copies to RAM)
+        self._patientMeta = None # spydcmtk PatientMeta - built on first use
         self.currentTimeID = 0
         self.currentArray = ''
         self.times = []
         self.scalarRange = {'Default':[0,255]}
+        self._scalarRangeLock = threading.Lock() # Lazily read frames widen scalarRange from the read thread
+        self._widenedRanges = set() # Arrays widened since last time change - see __applyWidenedScalarRanges
+        self.arrayStats = tuiStats.ArrayStatsCache() # Cached ranges / histograms per (array, time)
         self.boundingDist = 0.0
         self.multiPointFactor = 0.0001
         self._workingDir = os.getcwd()
@@ -60,6 +80,8 @@ class BaseMarkupViewer:
         self.animationTimer = None
         self.animationSpeed = 1  # Default speed (0=slowest, 3=fastest)
         self.speedIntervals = [200, 100, 50, 25]  # Milliseconds between frames for each speed
+        self.playbackScheduler = None  # tuiPlayback.PlaybackScheduler while animating
+        self.renderScheduler = None  # tuiRender.RenderScheduler - set up with the render window
         
         # Modifiable buttons
         self.nModPushButtons = 12
@@ -92,6 +114,21 @@ class BaseMarkupViewer:
         if hasattr(self, 'workingDirLineEdit') and self.workingDirLineEdit is not None:
             self.workingDirLineEdit.setText(value)
 
+    @property
+    def patientMeta(self):
+        """Image <-> patient coordinate mapping of current data. spydcmtk is imported here (on first use)
+        rather than at startup as it is slow to import"""
+        if self._patientMeta is None:
+            from spydcmtk import dcmVTKTK
+            self._patientMeta = dcmVTKTK.PatientMeta()
+            if self.vtiDict is not None:
+                self._patientMeta.initFromVTI(self.getCurrentVTIObject())
+        return self._patientMeta
+
+    @patientMeta.setter
+    def patientMeta(self, value):
+        self._patientMeta = value
+
     def _setupDefaultButtons(self):
         """Setup default customized buttons that can be overridden by subclasses"""
         self.modPushButtonDict = {
@@ -264,11 +301,42 @@ class BaseMarkupViewer:
         except Exception:
             return os.getcwd()
 
-    def setScalarRangeDictionary(self):
-        """Set scalar range for current array"""
-        for arrayName in vtkfilters.getArrayNames(self.getCurrentVTIObject()):
-            sR_t = [self.vtiDict[iT].GetPointData().GetArray(arrayName).GetRange() for iT in self.times]
-            self.scalarRange[arrayName] = [min([i[0] for i in sR_t]), max([i[1] for i in sR_t])]
+    def setScalarRangeDictionary(self, arrayNames=None):
+        """Set scalar range (over loaded timesteps) for arrayNames (default all arrays)
+        Per array / time ranges are cached (see tuiStats) so repeat calls are cheap.
+        Lazy frames read later widen the range as they are prepared (see _prepareFrame)"""
+        self.getCurrentVTIObject() # Ensure current frame is loaded
+        loadedFrames = self._getLoadedFrames()
+        if arrayNames is None:
+            arrayNames = vtkfilters.getArrayNames(self.getCurrentVTIObject())
+        for arrayName in arrayNames:
+            sR_t = [self.arrayStats.getRange(iVTI, iTime, arrayName) for iTime, iVTI in loadedFrames]
+            with self._scalarRangeLock:
+                self.scalarRange[arrayName] = [min([i[0] for i in sR_t]), max([i[1] for i in sR_t])]
+                self._widenedRanges.discard(arrayName)
+
+    def __widenScalarRange(self, vtiObj):
+        """Extend scalarRange of arrays already ranged to cover vtiObj - for lazy frames read after
+        setScalarRangeDictionary. May run on a read thread: the view is updated on the next time change"""
+        for arrayName in vtkfilters.getArrayNames(vtiObj):
+            vtkArray = vtiObj.GetPointData().GetArray(arrayName)
+            if vtkArray is None:
+                continue
+            sR = vtkArray.GetRange() # Component 0, as ArrayStatsCache.getRange
+            with self._scalarRangeLock:
+                current = self.scalarRange.get(arrayName, None)
+                if (current is None) or ((sR[0] >= current[0]) and (sR[1] <= current[1])):
+                    continue
+                self.scalarRange[arrayName] = [min(sR[0], current[0]), max(sR[1], current[1])]
+                self._widenedRanges.add(arrayName)
+
+    def __applyWidenedScalarRanges(self):
+        """Pass scalar ranges widened by newly read frames on to the view (main thread)"""
+        with self._scalarRangeLock:
+            arrayNames, self._widenedRanges = self._widenedRanges, set()
+        if len(arrayNames) > 0:
+            logger.debug("Scalar range widened by newly read frames: %s", sorted(arrayNames))
+            self._onScalarRangeChanged(sorted(arrayNames))
     
     def __calculateOptimalWindowLevel(self, arrayName=None):
         """Calculate optimal window level using percentile-based approach"""
@@ -276,27 +344,23 @@ class BaseMarkupViewer:
             arrayName = self.currentArray
             
         if arrayName not in self.scalarRange.keys():
-            self.setScalarRangeDictionary()
+            self.setScalarRangeDictionary([arrayName])
             
         # Get the current VTI object
         vtiObj = self.getCurrentVTIObject()
         
         try:
-            # Get the array data as numpy array for percentile calculation
-            arrayData = vtkfilters.getArrayAsNumpy(vtiObj, arrayName)
+            # 2nd and 98th percentiles (to exclude extreme outliers) from cached histogram of this array / time
+            percentiles = self.arrayStats.getPercentiles(vtiObj, self.getCurrentTime(), arrayName, (2, 98))
             
-            if arrayData is not None and arrayData.size > 0:
-                # Calculate 2nd and 98th percentiles to exclude extreme outliers
-                p2 = np.percentile(arrayData, 2)
-                p98 = np.percentile(arrayData, 98)
-                
+            if percentiles is not None:
+                p2, p98 = percentiles
                 # Use percentile range for window width
                 windowWidth = p98 - p2
                 # Center the window level
                 windowLevel = (p2 + p98) / 2.0
                 
                 logger.debug("Optimal window level (percentile-based): window=%.2f, level=%.2f", windowWidth, windowLevel)
-                logger.debug("Data range: %.2f to %.2f", np.min(arrayData), np.max(arrayData))
                 logger.debug("Percentile range: %.2f to %.2f", p2, p98)
                 
                 return windowWidth, windowLevel
@@ -404,22 +468,37 @@ class BaseMarkupViewer:
         self.currentTimeID = val
         self.updateTimeLabel()
         self.updateViewAfterTimeChange()
+        if self._widenedRanges:
+            self.__applyWidenedScalarRanges()
         if hasattr(self, 'timeSlider'):
+            self.timeSlider.blockSignals(True) # else valueChanged re-enters here and updates twice
             self.timeSlider.setValue(self.currentTimeID)
+            self.timeSlider.blockSignals(False)
         self._updateMarkups()
 
     def timeAdvance1(self):
         """Advance one time step"""
         if hasattr(self, 'timeSlider') and self.currentTimeID < (self.timeSlider.maximum()):
             self.currentTimeID += 1
+        self.prefetchFrames(direction=1, LOOP=False)
         self.moveTimeSlider(self.currentTimeID)
 
     def timeReverse1(self):
         """Reverse one time step"""
         if hasattr(self, 'timeSlider') and self.currentTimeID > (self.timeSlider.minimum()):
             self.currentTimeID -= 1
+        self.prefetchFrames(direction=-1, LOOP=False)
         self.moveTimeSlider(self.currentTimeID)
 
+    def prefetchFrames(self, direction=1, LOOP=True):
+        """Read upcoming timesteps in the background (lazy loading only)
+        Number of frames is chosen from the current animation speed"""
+        if self.framePrefetcher is None:
+            return
+        self.framePrefetcher.prefetchFrom(self.currentTimeID, direction=direction,
+                                          intervalMS=self.speedIntervals[self.animationSpeed],
+                                          LOOP=LOOP)
+
     # ANIMATION FUNCTIONALITY
     def toggleAnimation(self):
         """Toggle animation play/pause"""
@@ -439,14 +518,16 @@ class BaseMarkupViewer:
             self.playPauseButton.setText("Pause")
             self.playPauseButton.setChecked(True)
         
-        # Create timer if it doesn't exist
+        # Create timer if it doesn't exist - single shot, re-armed by animateNextFrame
         if self.animationTimer is None:
             from PyQt5.QtCore import QTimer
             self.animationTimer = QTimer()
+            self.animationTimer.setSingleShot(True)
             self.animationTimer.timeout.connect(self.animateNextFrame)
         
-        # Set timer interval based on current speed
+        # Frames scheduled on wall clock at interval based on current speed
         interval = self.speedIntervals[self.animationSpeed]
+        self.playbackScheduler = tuiPlayback.PlaybackScheduler(interval)
         self.animationTimer.start(interval)
         
         logger.debug("Animation started at speed %d (interval: %dms)", self.animationSpeed, interval)
@@ -460,23 +541,34 @@ class BaseMarkupViewer:
         
         if self.animationTimer:
             self.animationTimer.stop()
+        if self.playbackScheduler is not None:
+            logger.debug("Playback: %d frames shown, %d skipped, mean frame cost %.1f ms",
+                         self.playbackScheduler.nShown, self.playbackScheduler.nSkipped,
+                         self.playbackScheduler.frameCostMS)
+            self.playbackScheduler = None
+        if hasattr(self, 'fpsLabel'):
+            self.fpsLabel.setText("")
         
         logger.debug("Animation stopped")
 
     def animateNextFrame(self):
         """Move to next frame in animation loop"""
-        if not self.isAnimating:
+        if (not self.isAnimating) or (self.playbackScheduler is None):
             return
-            
-        # Move to next time step
-        if self.currentTimeID < len(self.times) - 1:
-            self.currentTimeID += 1
-        else:
-            # Loop back to beginning
-            self.currentTimeID = 0
+        t0 = time.perf_counter()
+        # Move to next time step (looping) - skip steps if behind the wall clock
+        self.currentTimeID = self.playbackScheduler.nextFrameID(self.currentTimeID, len(self.times))
         
+        # Read ahead while this frame is displayed
+        self.prefetchFrames(direction=1)
         # Update the display
         self.moveTimeSlider(self.currentTimeID)
+        self.renderNow() # Show this frame now (serves the frame's render requests) - part of frame cost
+        self.playbackScheduler.frameShown(time.perf_counter() - t0)
+        if hasattr(self, 'fpsLabel'):
+            self.fpsLabel.setText(self.playbackScheduler.getStatusString())
+        if self.isAnimating: # Next frame when due (always via the event loop)
+            self.animationTimer.start(self.playbackScheduler.getDelayMS())
 
     def setAnimationSpeed(self, speed):
         """Set animation speed (0=slowest, 3=fastest)"""
@@ -485,6 +577,8 @@ class BaseMarkupViewer:
         # Update timer interval if animation is running
         if self.isAnimating and self.animationTimer:
             interval = self.speedIntervals[speed]
+            if self.playbackScheduler is not None:
+                self.playbackScheduler.restart(interval)
             self.animationTimer.start(interval)
         
         speedNames = ["Slowest", "Slow", "Fast", "Fastest"]
@@ -519,10 +613,16 @@ class BaseMarkupViewer:
             return i2
         return ii
 
+    def _getLoadedFrames(self):
+        """List of (time, vti) currently in memory - all frames unless lazy loading"""
+        if isinstance(self.vtiDict, tuiFrameStore.LazyFrameDict):
+            return self.vtiDict.loadedItems()
+        return [(iTime, self.vtiDict[iTime]) for iTime in self.times]
+
     def selectArrayComboBoxActivated(self, selectedText):
         """Handle array selection change"""
-        for iTime in self.times:
-            self.vtiDict[iTime].GetPointData().SetActiveScalars(selectedText)
+        for _, iVTI in self._getLoadedFrames():
+            iVTI.GetPointData().SetActiveScalars(selectedText)
         self.updateViewAfterTimeChange()
         self.resetWindowLevel()
         if hasattr(self, 'statusBar'):
@@ -584,8 +684,13 @@ class BaseMarkupViewer:
 
     def loadDicomDir(self, dicomDir):
         """Load DICOM directory"""
-        dcmSeries = spydcmtk.dcmTK.DicomSeries.setFromDirectory(dicomDir)
-        self.vtiDict = dcmSeries.buildVTIDict()
+        self.stopFrameStreaming()
+        from tui import tuiDicom
+        self.currentArray = ''
+        self.vtiDict = tuiDicom.loadDicomDirToVTIDict(dicomDir, progressFunc=self.showProgress,
+                                                      USE_CACHE=self.useDicomCache)
+        for iTime in self.vtiDict.keys():
+            self._prepareFrame(self.vtiDict[iTime])
         logger.debug("Have VTI dict. Times (ms): %s", [int(i*1000.0) for i in sorted(self.vtiDict.keys())])
         self.workingDir = os.path.split(dicomDir)[0]
         self._setupAfterLoad()
@@ -597,7 +702,11 @@ class BaseMarkupViewer:
         logger.info("Load VTI")
         if not fileName:
             fileName = self._getFileViaDialog()
-        if isinstance(fileName, dict):
+        self.stopFrameStreaming()
+        self.currentArray = ''
+        if isinstance(fileName, tuiFrameStore.LazyFrameDict):
+            self.vtiDict = fileName.copy(prepareFunc=self._prepareFrame)
+        elif isinstance(fileName, dict):
             if isinstance(list(fileName.values())[0], vtk.vtkImageData):
                 self.vtiDict = fileName
             else:
@@ -609,13 +718,12 @@ class BaseMarkupViewer:
                 self.loadDicomDir(fileName)
                 return
             elif len(fileName) > 0:
-                self.vtiDict = fIO.readImageFileToDict(fileName)
+                self.vtiDict = self._readImageFile(fileName)
         else:
             raise ValueError(f"'fileName' should be a str or a VTI obj or dict")
-        for iTime in self.vtiDict.keys():
-            for iName in vtkfilters.getArrayNames(self.vtiDict[iTime]):
-                vtkfilters.setArrayDtype(self.vtiDict[iTime], iName, np.float64)
-            vtkfilters.ensureScalarsSet(self.vtiDict[iTime])
+        if not isinstance(self.vtiDict, tuiFrameStore.LazyFrameDict):
+            for iTime in self.vtiDict.keys():
+                self._prepareFrame(self.vtiDict[iTime])
         logger.info("Data loaded")
         try:
             self.workingDir = os.path.split(fileName)[0]
@@ -624,6 +732,40 @@ class BaseMarkupViewer:
             self.workingDir = os.path.expanduser('~')
         self._setupAfterLoad()
 
+    def _readImageFile(self, fileName):
+        """Read image file (PVD or single image) to vtiDict - lazy and / or memory mapped if set"""
+        fileDict = fIO.readPVDFileName(fileName)
+        readFunc = tuiMemmap.readVTKFileMemmap if self.memmapBackend else fIO.readVTKFile
+        if self.lazyLoading and (len(fileDict) > 1):
+            logger.info("Lazy loading %d timesteps (cache %.1f MB)", len(fileDict), self.frameCacheBytes/1024**2)
+            return tuiFrameStore.LazyFrameDict(fileDict,
+                                               maxBytes=self.frameCacheBytes,
+                                               prepareFunc=self._prepareFrame,
+                                               readFunc=readFunc)
+        if self.streamLoading and (len(fileDict) > 1):
+            times = sorted(fileDict.keys())
+            logger.info("Streaming %d timesteps (first shown immediately)", len(times))
+            self.frameStreamer = tuiFrameStore.FrameStreamer(dict([(iTime, fileDict[iTime]) for iTime in times[1:]]),
+                                                             prepareFunc=self._prepareFrame,
+                                                             readFunc=readFunc)
+            return {times[0]: readFunc(fileDict[times[0]])}
+        if self.memmapBackend:
+            if len(fileDict) == 1:
+                vtiDict = tuiMemmap.readImageFileMemmapToDict(fileName) # May be 4D (NIfTI)
+                if vtiDict is not None:
+                    logger.info("Memory mapped %s", fileName)
+                    return vtiDict
+            return dict([(iTime, readFunc(fileDict[iTime])) for iTime in fileDict.keys()])
+        return fIO.readImageFileToDict(fileName)
+
+    def _prepareFrame(self, vtiObj):
+        """Prepare a single timestep after reading (dtype, active scalars)"""
+        tuiUtils.applyDtypePolicy(vtiObj, self.dtypePolicy)
+        vtkfilters.ensureScalarsSet(vtiObj)
+        if self.currentArray and (self.currentArray in vtkfilters.getArrayNames(vtiObj)):
+            vtiObj.GetPointData().SetActiveScalars(self.currentArray)
+        self.__widenScalarRange(vtiObj)
+
     def _setupAfterLoad(self):
         """Setup after data load - to be overridden by subclasses"""
         # Stop any running animation
@@ -631,7 +773,16 @@ class BaseMarkupViewer:
             self.stopAnimation()
             
         self.times = sorted(self.vtiDict.keys())
-        self.patientMeta.initFromVTI(self.getCurrentVTIObject())
+        if self.framePrefetcher is not None:
+            self.framePrefetcher.shutdown()
+            self.framePrefetcher = None
+        self.arrayStats.clear()
+        with self._scalarRangeLock:
+            self.scalarRange = {'Default':[0,255]}
+            self._widenedRanges = set()
+        if isinstance(self.vtiDict, tuiFrameStore.LazyFrameDict):
+            self.framePrefetcher = tuiFrameStore.FramePrefetcher(self.vtiDict)
+        self._patientMeta = None
         # Reset Markups
         self.Markups.initForNewData(len(self.times))
         self.setupTimeSlider()
@@ -647,6 +798,7 @@ class BaseMarkupViewer:
             self.selectArrayComboBox.addItem(iArray)
         self.selectArrayComboBox.setCurrentText(self.currentArray)
         
+        self.reportDataMemory()
         # Calculate bounding distance
         bounds = self.getCurrentVTIObject().GetBounds()
         self.boundingDist = max([bounds[1]-bounds[0], bounds[3]-bounds[2], bounds[5]-bounds[4]])
@@ -655,6 +807,83 @@ class BaseMarkupViewer:
         self._setupViewerSpecificData()
         
         self.moveTimeSlider(self.currentTimeID)
+        if self.frameStreamer is not None:
+            self.startFrameStreaming()
+
+    # PROGRESSIVE (STREAMING) LOAD
+    def startFrameStreaming(self):
+        """Start reading remaining timesteps in the background - these are added as they arrive"""
+        self.frameStreamer.start()
+        if self.streamTimer is None:
+            from PyQt5.QtCore import QTimer
+            self.streamTimer = QTimer()
+            self.streamTimer.timeout.connect(self._addStreamedFrames)
+        self.streamTimer.start(50)
+
+    def stopFrameStreaming(self):
+        """Stop any background load in progress"""
+        if self.streamTimer is not None:
+            self.streamTimer.stop()
+        if self.frameStreamer is not None:
+            self.frameStreamer.stop()
+            self.frameStreamer = None
+
+    def _addStreamedFrames(self):
+        """Timer callback: add timesteps read since last call, grow time slider, show progress"""
+        if self.frameStreamer is None:
+            return
+        newTimes = []
+        for iTime, vtiObj in self.frameStreamer.getReady():
+            self.vtiDict[iTime] = vtiObj
+            self.times.append(iTime)
+            newTimes.append(iTime)
+        if len(newTimes) > 0:
+            self.Markups.extendTimes(len(self.times))
+            if hasattr(self, 'timeSlider'):
+                self.timeSlider.setMaximum(len(self.times)-1)
+            self._onTimestepsAdded(newTimes)
+            self.updateTimeLabel()
+        nDone, nTotal = self.frameStreamer.nRead+1, self.frameStreamer.nTotal+1
+        if self.frameStreamer.isDone():
+            self.streamTimer.stop()
+            nFailed = self.frameStreamer.nFailed
+            self.frameStreamer = None
+            self.setScalarRangeDictionary()
+            msg = "Loaded %d timesteps"%(len(self.times))
+            if nFailed > 0:
+                msg += " (%d failed to read)"%(nFailed)
+            logger.info(msg)
+            if hasattr(self, 'statusBar'):
+                self.statusBar().showMessage(msg)
+        elif hasattr(self, 'statusBar'):
+            self.statusBar().showMessage("Loading timesteps: %d/%d (%d%%)"%(nDone, nTotal, 100*nDone/nTotal))
+
+    def _onTimestepsAdded(self, newTimes):
+        """Override in subclasses to set up per-timestep data for newly streamed times"""
+        pass
+
+    def reportDataMemory(self):
+        """Log (and show) memory used by the dataset under the current dtype policy vs float64"""
+        nBytes, nBytes64 = tuiUtils.applyDtypePolicy(self.getCurrentVTIObject(), tuiUtils.DTYPE_NATIVE)
+        nTimes = len(self.times)
+        nBytes, nBytes64 = nBytes * nTimes, nBytes64 * nTimes
+        msg = "Data memory (%s): %.1f MB - saved %.1f MB vs float64"%(self.dtypePolicy,
+                                                                       nBytes / 1024**2,
+                                                                       (nBytes64 - nBytes) / 1024**2)
+        logger.info(msg)
+        if hasattr(self, 'statusBar'):
+            self.statusBar().showMessage(msg)
+        return nBytes, nBytes64
+
+    def showProgress(self, message, nDone, nTotal):
+        """Show progress of a long running task in the status bar (throttled, keeps UI alive)"""
+        now = time.perf_counter()
+        if (nDone < nTotal) and (now - getattr(self, '_lastProgressTime', 0.0) < 0.1):
+            return
+        self._lastProgressTime = now
+        if hasattr(self, 'statusBar'):
+            self.statusBar().showMessage("%s: %d/%d (%d%%)"%(message, nDone, nTotal, 100*nDone/max(1, nTotal)))
+            QtWidgets.QApplication.processEvents()
 
     def _setupViewerSpecificData(self):
         """Override in subclasses for viewer-specific setup"""
@@ -765,6 +994,10 @@ class BaseMarkupViewer:
         """Update view after time change - to be overridden by subclasses"""
         pass
 
+    def _onScalarRangeChanged(self, arrayNames):
+        """scalarRange of arrayNames widened (lazily read frame) - to be overridden by subclasses"""
+        pass
+
     def getWindowLevel(self):
         """Get window level - to be overridden by subclasses"""
         return 255, 127.5
@@ -794,21 +1027,18 @@ class BaseMarkupViewer:
     # COORDINATE CONVERSION METHODS
     def getPointIDAtX(self, X):
         """Get point ID from world coordinates - to be overridden by subclasses"""
-        return self.getCurrentVTIObject().FindPoint(X)
+        return int(tuiCoordinates.imageXToPointID(self.getCurrentVTIObject(), X))
     
     def getIJKAtX(self, X):
         """Convert world coordinates to IJK coordinates - to be overridden by subclasses"""
-        ijk = [0, 0, 0]
-        pcoords = [0.0, 0.0, 0.0]
-        res = self.getCurrentVTIObject().ComputeStructuredCoordinates(X, ijk, pcoords)
-        if res == 0:
+        ijk, inside = tuiCoordinates.imageXToStructuredIJK(self.getCurrentVTIObject(), X)
+        if not inside:
             return None
-        return ijk
+        return [int(i) for i in ijk]
     
     def getIJKAtPtID(self, ptID):
         """Get IJK coordinates from point ID - to be overridden by subclasses"""
-        X = self.getCurrentVTIObject().GetPoint(ptID)
-        return self.getIJKAtX(X)
+        return [int(i) for i in tuiCoordinates.pointIDToIJK(self.getCurrentVTIObject().GetDimensions(), ptID)]
     
     def getPixelValueAtPtID_tuple(self, ptID):
         """Get pixel value tuple from point ID - to be overridden by subclasses"""
@@ -858,12 +1088,25 @@ class BaseMarkupViewer:
         
         self.renderWindow = self.graphicsViewVTK.GetRenderWindow()
         self.renderWindow.SetMultiSamples(0)
+        self.renderScheduler = tuiRender.RenderScheduler(self.renderWindow)
         
         self.graphicsViewVTK.Initialize()
         self.graphicsViewVTK.Start()
         
         return self.graphicsViewVTK, self.renderWindow
 
+    def requestRender(self):
+        """Render once when control returns to the Qt event loop (repeated requests are coalesced)"""
+        if self.renderScheduler is not None:
+            self.renderScheduler.requestRender()
+
+    def renderNow(self):
+        """Render immediately - for when the rendered result is needed straight away"""
+        if self.renderScheduler is not None:
+            self.renderScheduler.renderNow()
+        elif hasattr(self, 'renderWindow'):
+            self.renderWindow.Render()
+
     def showHelpWindow(self):
         """Show help window with keyboard shortcuts and interaction guide"""
         # Import here to avoid circular imports
@@ -1040,6 +1283,11 @@ class BaseMarkupViewer:
 
     def exit(self):
         """Exit application"""
+        if self.framePrefetcher is not None:
+            self.framePrefetcher.shutdown()
+        self.stopFrameStreaming()
+        if self.renderScheduler is not None:
+            self.renderScheduler.cancel()
         self.close()
         return 0
 
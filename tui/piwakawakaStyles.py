@@ -138,9 +138,9 @@ class SinglePaneImageInteractor(vtk.vtkInteractorStyleImage):
             logger.info("Screenshot saved to %s", ffOut)
         elif key == "W":
             ## WRITE OUT MARKUPS
-            allMarkupPointsThisTime = self.parentImageViewer.Markups.getAllPointsForTime(self.parentImageViewer.currentTimeID)
+            allMarkupPointsThisTime = self.parentImageViewer.Markups.getXNumpyFromPoints(self.parentImageViewer.currentTimeID)
             if len(allMarkupPointsThisTime) > 0:
-                pointsPP = vtkfilters.buildPolydataFromXYZ([i.xyz for i in allMarkupPointsThisTime])
+                pointsPP = vtkfilters.buildPolydataFromXYZ(allMarkupPointsThisTime)
                 fOut = fIO.writeVTKFile(pointsPP, os.path.join(self.parentImageViewer.workingDirLineEdit.text(), 'points_%d.vtp'%(self.parentImageViewer.currentTimeID)))
                 logger.info("Written markups to %s", fOut)
         elif key == "c":
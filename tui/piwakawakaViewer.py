@@ -17,8 +17,7 @@ import vtk
 import os
 import numpy as np
 from ngawari import vtkfilters
-from tui import piwakawakamarkupui, piwakawakaStyles, baseMarkupViewer, tuiUtils
-import scipy.interpolate as interpolate
+from tui import piwakawakamarkupui, piwakawakaStyles, baseMarkupViewer, tuiUtils, tuiExport, tuiSliceStore, tuiCoordinates, tuiMarkups
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +51,19 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.currentSliceID = 0
         self.maxSliceID = 0
         self.sliceOrientation = tuiUtils.AXIAL  # 'AXIAL', 'CORONAL', 'SAGITTAL'
-        self.resliceDict = {}  # Dictionary: {timestep: [list of reslices]}
+        self.resliceDict = {}  # {timestep: [reslice per slice]} - a tuiSliceStore.LazyResliceDict after load
+        self.sliceCacheBytes = tuiSliceStore.DEFAULT_SLICE_CACHE_BYTES
+        self.fastAxisAlignedSlices = True  # AXIAL/CORONAL/SAGITTAL slices copied from volume array (no vtkImageReslice)
+        # Cine: animation shows precomputed window levelled textures of current slice
+        self.cineMode = False
+        self.cineCache = tuiSliceStore.CineTextureCache()
+        self.cineActor = None
+        # Custom (oblique) slices: interactiveInterpolation while scrolling, redone with
+        # stillInterpolation after interactionIdleMS without scrolling
+        self.interactiveInterpolation = tuiUtils.INTERP_NEAREST
+        self.stillInterpolation = tuiUtils.INTERP_LINEAR
+        self.interactionIdleMS = 250
+        self.interactionIdleTimer = None
         self.sliceCenters = []  # List of center points for slices
         self.sliceNormals = []  # List of normal vectors for slices
         # Custom slice settings
@@ -66,6 +77,8 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         # Piwakawaka-specific renderer setup (single renderer)
         self.renderer = vtk.vtkRenderer()
         self.renderWindow.AddRenderer(self.renderer)
+        self.pointGlyphLayer = tuiMarkups.PointGlyphLayer() # Persistent point markups
+        self.renderer.AddActor(self.pointGlyphLayer.actor)
         
         self.interactionState = None
         self.graphicsViewVTK.picker = vtk.vtkPropPicker()
@@ -106,6 +119,8 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         # Image manipulation buttons
         self.imManip_A.clicked.connect(self.flipCamera)
         self.imManip_B.clicked.connect(self.rotateCamera90)
+        if hasattr(self, 'cineCheckBox'):
+            self.cineCheckBox.stateChanged.connect(self.cineModeChanged)
         ##
         self.updatePushButtonDict()
 
@@ -131,9 +146,11 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.currentSliceID = val
         self.updateSliceLabel()
         self.updateImageSlice()
-        self.updateViewAfterSliceChange()
+        self.sliceSlider.blockSignals(True) # else valueChanged re-enters here and updates twice
         self.sliceSlider.setValue(self.currentSliceID)
-        self._updateMarkups()
+        self.sliceSlider.blockSignals(False)
+        self._updateMarkups() # requests render
+        self.__startInteractionIdleTimer()
 
     # SLICE SLIDER
     def scrollForwardCurrentSlice1(self):
@@ -159,11 +176,11 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.renderer.ResetCamera()
         # Set reference scale for zoom calculation
         self._referenceParallelScale = self.renderer.GetActiveCamera().GetParallelScale()
-        self.renderWindow.Render()
+        self.requestRender()
 
     def cameraReset3D(self):
         self.renderer.ResetCameraClippingRange()
-        self.renderWindow.Render()
+        self.requestRender()
 
     def getZoomFactor(self):
         """Get current zoom factor from camera for 2D viewer"""
@@ -196,7 +213,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         # Flip horizontally by negating the x-component of position relative to focal point
         new_pos = [2 * focal[0] - pos[0], pos[1], pos[2]]
         camera.SetPosition(new_pos)
-        self.renderWindow.Render()
+        self.requestRender()
 
     def rotateCamera90(self):
         """Rotate the camera view 90 degrees clockwise"""
@@ -214,7 +231,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         # For a 90-degree rotation around Z-axis: (x, y) -> (-y, x)
         new_viewUp = [-viewUp[1], viewUp[0], viewUp[2]]
         camera.SetViewUp(new_viewUp)
-        self.renderWindow.Render()
+        self.requestRender()
 
     # Window level methods inherited from base class
 
@@ -304,7 +321,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.orientationComboBox.setCurrentText(tuiUtils.AXIAL)
         
         # Get image dimensions and build reslice dictionary BEFORE setting up image data
-        ii = list(self.vtiDict.values())[0]
+        ii = self.vtiDict[self.times[0]]
         dims = [0,0,0]
         ii.GetDimensions(dims)
         
@@ -330,7 +347,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.moveSliceSlider(self.currentSliceID)
     
     def buildResliceDictionary(self, orientation=None, customCenters=None, customNormals=None):
-        """Build dictionary of reslices for all timesteps
+        """Build (lazy) dictionary of reslices for all timesteps - slices are computed when first shown
         
         Args:
             orientation: 'AXIAL', 'CORONAL', 'SAGITTAL', or None for custom
@@ -340,14 +357,13 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         if orientation is None and (customCenters is None or customNormals is None):
             orientation = self.sliceOrientation
         
-        self.resliceDict = {}
         self.sliceCenters = []
         self.sliceNormals = []
         
         logger.debug("Building reslice dictionary with orientation: %s", orientation)
         
         # Get image dimensions for default slice generation
-        ii = list(self.vtiDict.values())[0]
+        ii = self.vtiDict[self.times[0]]
         dims = [0, 0, 0]
         ii.GetDimensions(dims)
         origin = ii.GetOrigin()
@@ -381,17 +397,18 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
                     self.sliceCenters.append(sliceCenter)
                     self.sliceNormals.append([1, 0, 0])
         
-        # Build reslices for each timestep
-        for timeStep in self.times:
-            vtiObj = self.vtiDict[timeStep]
-            resliceList = []
-            
-            for i, (sliceCenter, sliceNormal) in enumerate(zip(self.sliceCenters, self.sliceNormals)):
-                reslice = tuiUtils.defineReslice(vtiObj, orientation, sliceCenter, normalVector=sliceNormal)
-                resliceList.append(reslice)
-            
-            self.resliceDict[timeStep] = resliceList
+        self.cineCache.clear()
+        # Reslices for each timestep / slice are built on request
+        self.resliceDict = tuiSliceStore.LazyResliceDict(self.vtiDict, self.times, self.sliceCenters, self.sliceNormals,
+                                                         orientation=orientation, maxBytes=self.sliceCacheBytes,
+                                                         AXIS_ALIGNED_FAST=self.fastAxisAlignedSlices,
+                                                         interpolation=self.interactiveInterpolation)
         logger.debug("Reslice dictionary built with %d slices", len(self.sliceCenters))
+
+    def _onTimestepsAdded(self, newTimes):
+        """Make timesteps added by a streaming load available for reslicing"""
+        if isinstance(self.resliceDict, tuiSliceStore.LazyResliceDict):
+            self.resliceDict.addTimes(newTimes)
     
     def setSliceOrientation(self, orientation):
         """Change the slice orientation and rebuild reslice dictionary"""
@@ -423,6 +440,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.setupSliceSlider()
         self.updateImageSlice()
         self.updateViewAfterSliceChange()
+        self.__startInteractionIdleTimer()
         
         logger.debug("Set %d custom slices", len(centers))
     
@@ -458,15 +476,12 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         return self.getIJKAtX(self.imageCS_to_ResliceCS_X(imageCS_X))
 
     def getPtID_at_IJK(self, ijk):
-        dims = self.getCurrentVTIObject().GetDimensions()
-        i, j, k = ijk
-        pointId = i + j * dims[0] + k * dims[0] * dims[1]
-        return pointId
+        return int(tuiCoordinates.ijkToPointID(self.getCurrentVTIObject().GetDimensions(), ijk))
 
     def getPixelValueAtReslicePosition(self, mouseX, mouseY):
         """Get pixel value at mouse position from the current reslice"""
         X_imageCS = self.mouseXYTo_ImageCS_X(mouseX, mouseY)
-        ptID = self.getCurrentVTIObject().FindPoint(X_imageCS)
+        ptID = self.getPointIDAtX(X_imageCS)
         return self.getPixelValueAtPtID_tuple(ptID)
         
     def getReslice_IJK_X_ID_AtMouse(self, mouseX, mouseY):
@@ -484,7 +499,8 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
             currentTime = self.times[self.currentTimeID]
             resliceList = self.resliceDict[currentTime]
             matrix = resliceList[sliceID].GetResliceAxes()
-        return matrix.MultiplyPoint([imageCS_X[0], imageCS_X[1], imageCS_X[2], 1])[:3]
+        M = np.array([[matrix.GetElement(i, j) for j in range(4)] for i in range(4)])
+        return np.asarray(imageCS_X, dtype=float).dot(M[:3, :3].T) + M[:3, 3] # (3,) or (N,3)
     
     def resliceCS_X_to_imageCS(self, resliceX):
         matrix = self.getCurrentResliceMatrix()
@@ -499,13 +515,13 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
             1. Convert image coordinates to reslice coordinates
             2. Get IJK coordinates in reslice coordinates
             3. Convert IJK coordinates to world coordinates using PatientMeta
+        imageCS_X may be (3,) - returns None if outside - or (N,3) - rows outside are nan
         """
         worldX_in_reslice = self.imageCS_to_ResliceCS_X(imageCS_X, sliceID)
-        ijk_in_reslice = self.getIJKAtX(worldX_in_reslice)
-        if ijk_in_reslice is None:
+        X_world, inside = tuiCoordinates.imageXToPatient(self.getCurrentVTIObject(), self.patientMeta, worldX_in_reslice)
+        if np.ndim(inside) == 0 and not inside:
             return None
-        imageCS_ijk = np.array([ijk_in_reslice[0], ijk_in_reslice[1], ijk_in_reslice[2]])
-        return np.array(self.patientMeta.imageToPatientCoordinates(imageCS_ijk))
+        return X_world
 
 
     def mouseXYTo_ImageCS_X(self, mouseX, mouseY):
@@ -532,16 +548,26 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
 
 
     def hardReset(self):
+        if isinstance(self.resliceDict, tuiSliceStore.LazyResliceDict):
+            self.resliceDict.clear() # Cached slices hold the previous active array
+        self.cineCache.clear()
         self.__setupNewImageData()
 
 
     def __setupNewImageData(self): # ONLY ON NEW DATA LOAD
-        self.setScalarRangeDictionary()
+        self.setScalarRangeDictionary([self.currentArray])
         # Set background color
         self.renderer.SetBackground(0.1, 0.1, 0.1)
         # Create image actor for slice display
         self.imageActor = vtk.vtkImageActor()
         self.renderer.AddActor(self.imageActor)
+        # Cine texture actor - not pickable so window level interaction stays on imageActor
+        if self.cineActor is not None:
+            self.renderer.RemoveActor(self.cineActor)
+        self.cineActor = vtk.vtkImageActor()
+        self.cineActor.PickableOff()
+        self.cineActor.VisibilityOff()
+        self.renderer.AddActor(self.cineActor)
         # Update to show current slice
         self.updateImageSlice()
         # Set initial window level based on data
@@ -558,13 +584,23 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.updateViewAfterSliceChange()
 
     def updateViewAfterSliceChange(self):
-        self.renderWindow.Render()
+        self.requestRender()
     
     def updateImageSlice(self):
         """Update the image actor to show the current slice using pre-built reslices"""
         if not hasattr(self, 'imageActor') or not self.imageActor:
             logger.warning("Image actor not initialized")
             return
+        if self.isCinePlaying():
+            textureVTI = self.__getCineTexture()
+            if textureVTI is not None:
+                self.cineActor.SetInputData(textureVTI)
+                self.cineActor.VisibilityOn()
+                self.imageActor.VisibilityOff()
+                return
+        if (self.cineActor is not None) and self.cineActor.GetVisibility():
+            self.cineActor.VisibilityOff()
+            self.imageActor.VisibilityOn()
         currentReslice = self.getCurrentReslice()
         if currentReslice is not None:
             thisImageSlice = currentReslice.GetOutput()
@@ -573,6 +609,72 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
             logger.warning("No reslice available for slice %d", self.currentSliceID)
 
 
+    def __startInteractionIdleTimer(self):
+        """(Re)start timer to redo current slice with stillInterpolation once scrolling stops"""
+        if self.interactiveInterpolation == self.stillInterpolation:
+            return
+        if self.interactionIdleTimer is None:
+            from PyQt5.QtCore import QTimer
+            self.interactionIdleTimer = QTimer()
+            self.interactionIdleTimer.setSingleShot(True)
+            self.interactionIdleTimer.timeout.connect(self.__refineCurrentSlice)
+        self.interactionIdleTimer.start(self.interactionIdleMS)
+
+    def __refineCurrentSlice(self):
+        """Redo current slice with stillInterpolation (in place - image actor input unchanged)"""
+        if (not isinstance(self.resliceDict, tuiSliceStore.LazyResliceDict)) or self.isAnimating:
+            return
+        try:
+            reslice = self.resliceDict.refine(self.getCurrentTime(), self.currentSliceID, self.stillInterpolation)
+        except (KeyError, IndexError):
+            return
+        if isinstance(reslice, tuiSliceStore.ResliceCopy):
+            self.requestRender()
+
+
+    # ======================== CINE ====================================================================================
+    def cineModeChanged(self, state):
+        """Cine checkbox: animation swaps precomputed textures of the current slice"""
+        self.cineMode = bool(state)
+        if self.cineMode and self.isAnimating:
+            self.fillCineCache()
+        elif not self.cineMode:
+            self.cineCache.clear()
+            self.updateImageSlice()
+            self.requestRender()
+
+    def isCinePlaying(self):
+        return self.cineMode and self.isAnimating and (self.cineActor is not None)
+
+    def __getCineTexture(self):
+        """Texture for current time / slice / array / window level - None if not possible"""
+        w, l = self.getWindowLevel()
+        try:
+            return self.cineCache.getTexture(self.resliceDict, self.getCurrentTime(), self.currentSliceID,
+                                             self.currentArray, w, l)
+        except (KeyError, IndexError):
+            return None
+
+    def fillCineCache(self):
+        """Precompute textures of the current slice for all timesteps (until cache full)"""
+        if (not self.resliceDict) or (len(self.times) == 0):
+            return
+        w, l = self.getWindowLevel()
+        nCached = self.cineCache.fill(self.resliceDict, self.times, self.currentSliceID, self.currentArray, w, l)
+        logger.info("Cine: %d of %d timesteps cached (%.1f MB)", nCached, len(self.times), self.cineCache.nBytes / 1024**2)
+
+    def startAnimation(self):
+        if self.cineMode:
+            self.fillCineCache()
+        baseMarkupViewer.BaseMarkupViewer.startAnimation(self)
+
+    def stopAnimation(self):
+        baseMarkupViewer.BaseMarkupViewer.stopAnimation(self)
+        if self.cineMode: # Back to the image actor (markups, picking, window level)
+            self.updateImageSlice()
+            self.requestRender()
+
+
     def updateAllActorsToCurrentSlice(self):
         """
         For perfomrance action only on slider release
@@ -594,6 +696,10 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.markupActorList = []
 
     def _updateMarkups(self, window=None, level=None):
+        if self.isCinePlaying() and (window is None) and (len(self.markupActorList) == 0) and \
+                (self.pointGlyphLayer.getNumberOfPoints() == 0) and (not self.Markups.hasMarkups()):
+            self.requestRender() # Nothing to rebuild
+            return
         self.clearCurrentMarkups()
         ## POINTS
         # Calculate base point size
@@ -608,10 +714,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         # Clamp point size to reasonable range
         pointSize = max(basePointSize * 0.1, min(basePointSize * 5.0, pointSize))
 
-        ptsActor = self.Markups.getAllPointsActors(self.currentTimeID, pointSize, sliceID=self.currentSliceID)
-        if ptsActor is not None:
-            self.renderer.AddActor(ptsActor)
-            self.markupActorList.append(ptsActor)
+        self.Markups.updatePointsLayer(self.pointGlyphLayer, self.currentTimeID, pointSize, sliceID=self.currentSliceID)
         ## POLYDATA
         pdActors = self.Markups.getAllPolydataActors(self.currentTimeID)
         if len(pdActors) > 0:
@@ -622,7 +725,7 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
         self.Markups.showSplines_timeID_sliceID(self.currentTimeID, self.getCurrentSliceID())
         if (window is not None) and (level is not None):
             self.setWindowLevel(window, level)
-        self.renderWindow.Render()
+        self.requestRender()
 
 
 
@@ -656,16 +759,15 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
                                   FULL_VIEW=FULL_VIEW, size=size)
 
     def __saveImages(self, outputDir, startPt, endPt, nImages, viewID, outputPrefix='', FULL_VIEW=False, size=None):
-        from PIL import Image
         fileOutList = []
         w, l = self.getWindowLevel()
-        lowP, highP = l-(w/2.), l+(w/2.)
         imageLine = vtkfilters.buildPolyLineBetweenTwoPoints(startPt, endPt, nImages)
         allCP = vtkfilters.getPtsAsNumpy(imageLine)
         for k1, cp in enumerate(allCP):
             # Update camera position for different views
             self.renderer.GetActiveCamera().SetPosition(cp)
-            self._updateMarkups(w, l)  # will render
+            self._updateMarkups(w, l)
+            self.renderNow() # Reslice output / window captured below
             fOut = os.path.join(outputDir, f'{outputPrefix}{k1}.png')
             if FULL_VIEW:
                 windowToImageFilter = vtk.vtkWindowToImageFilter()
@@ -677,27 +779,8 @@ class PIWAKAWAKAMarkupViewer(piwakawakamarkupui.QtWidgets.QMainWindow, piwakawak
                 writer.Write()
             else:
                 ii = self.getCurrentResliceAsVTI(COPY=True)
-                dims = ii.GetDimensions()
-                A = vtkfilters.getArrayAsNumpy(ii, 'ImageScalars')
-                A[A < lowP] = lowP
-                A[A > highP] = highP
-                A = A + abs(np.min(A)) # Max all pixels positive
-                A = (A / np.max(A) * 255) # Set to 0-255
-                A = np.reshape(A, (dims[0], dims[1]), order='F')
-                A = np.rot90(A, 1) # FIXME - should work out this number from viewID
-                img = Image.fromarray(A.astype(np.uint8))  # uses mode='L'
-                if size is not None:
-                    try: 
-                        size[1] 
-                    except (TypeError, IndexError): 
-                        size = [size, size]
-                    wh = img.size
-                    whMaxID = np.argmax(wh)
-                    ratios = [wh[0] / wh[whMaxID], wh[1] / wh[whMaxID]]
-                    if wh[whMaxID] > max(size):
-                        sizeN = [size[0] * ratios[0], size[1] * ratios[1]]
-                        img = img.resize((int(sizeN[0]), int(sizeN[1])))
-                img.save(fOut)
+                A = tuiExport.sliceToUint8(ii, w, l, 'ImageScalars') # FIXME - rotation should be worked out from viewID
+                tuiExport.writePNG(A, fOut, size)
             fileOutList.append(fOut)
         return fileOutList
         # os.system('convert %s -resize 400x400 %s'%(fOut, fOut))
@@ -744,7 +827,7 @@ def interpolateSplinesOverTime(piwakawakaViewer):
             newPts = np.squeeze(XY2[:, colID, :])
             newPts = [[i[0],i[1],0.0] for i in newPts]
             piwakawakaViewer.Markups.addSpline(newPts, 
-                                                piwakawakaViewer.resliceDict[times[iTimeID]], 
+                                                piwakawakaViewer.resliceDict[times[iTimeID]][piwakawakaViewer.getCurrentSliceID()], 
                                                 piwakawakaViewer.renderer, 
                                                 piwakawakaViewer.graphicsViewVTK, 
                                                 timeID=iTimeID,
@@ -765,6 +848,7 @@ def splineRoisOverTime(XYmat, u):
     :param u:
     :return:
     """
+    import scipy.interpolate as interpolate
     XYmat = XYmat * 10000.0
     m, n, TWO = XYmat.shape
     XYout = np.zeros((m, n, TWO))
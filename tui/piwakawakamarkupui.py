@@ -91,6 +91,12 @@ class Ui_BASEUI(BaseMarkupUI):
         self.speedSlider.setTickInterval(1)
         self.speedControlLayout.addWidget(self.speedSlider)
         
+        # Cine: play precomputed window levelled slice textures
+        self.cineCheckBox = QtWidgets.QCheckBox(self.centralwidget)
+        self.cineCheckBox.setObjectName("cineCheckBox")
+        self.cineCheckBox.setChecked(False)
+        self.speedControlLayout.addWidget(self.cineCheckBox)
+        
         self.animationLayout.addLayout(self.speedControlLayout)
     
     def _addMarkupModeItems(self):
@@ -117,4 +123,5 @@ class Ui_BASEUI(BaseMarkupUI):
         
         # Animation controls
         self.speedLabel.setText(_translate("BASEUI", "Speed:"))
+        self.cineCheckBox.setText(_translate("BASEUI", "Cine"))
 
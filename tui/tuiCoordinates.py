@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Batched coordinate conversions between image coordinates (X, the vtkImageData
+frame), voxel indices (IJK), point IDs and patient (world) coordinates.
+
+All functions take a single position (3,) or an array of positions (N,3) and
+return results with a matching leading dimension. Nothing loops over points.
+
+Rounding follows VTK:
+    nearest voxel    (vtkImageData.FindPoint):                  floor(d / spacing + 0.5), -1 if outside
+    containing cell  (vtkImageData.ComputeStructuredCoordinates): floor(d / spacing), upper bound in last cell
+Patient coordinates use the image to patient matrix of spydcmtk PatientMeta (getMatrix).
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import numpy as np
+
+
+# ==========================================================
+#   IMAGE GEOMETRY
+# ==========================================================
+def getGeometry(vtiObj):
+    """(dims, origin, spacing, direction (3x3) or None if identity) of vtkImageData as numpy"""
+    dims = np.array(vtiObj.GetDimensions(), dtype=np.int64)
+    origin = np.array(vtiObj.GetOrigin(), dtype=float)
+    spacing = np.array(vtiObj.GetSpacing(), dtype=float)
+    directionMatrix = vtiObj.GetDirectionMatrix()
+    D = None
+    if (directionMatrix is not None) and (not directionMatrix.IsIdentity()):
+        D = np.array([[directionMatrix.GetElement(i, j) for j in range(3)] for i in range(3)])
+    return dims, origin, spacing, D
+
+
+def _asPoints(X):
+    """(N,3) float array and whether the input was a single point"""
+    X = np.asarray(X, dtype=float)
+    return np.atleast_2d(X), (X.ndim == 1)
+
+
+def _asReturned(A, SINGLE):
+    return A[0] if SINGLE else A
+
+
+def imageXToContinuousIJK(vtiObj, X):
+    """Continuous (float) voxel index of image coordinates X"""
+    X, SINGLE = _asPoints(X)
+    _, origin, spacing, D = getGeometry(vtiObj)
+    d = X - origin
+    if D is not None:
+        d = d.dot(D) # D.T . d for each row
+    return _asReturned(d / spacing, SINGLE)
+
+
+def ijkToImageX(vtiObj, ijk):
+    """Image coordinates of voxel index ijk (int or float)"""
+    ijk, SINGLE = _asPoints(ijk)
+    _, origin, spacing, D = getGeometry(vtiObj)
+    d = ijk * spacing
+    if D is not None:
+        d = d.dot(D.T)
+    return _asReturned(d + origin, SINGLE)
+
+
+def isInside(dims, ijk):
+    """True for each (integer) ijk within dims"""
+    ijk = np.atleast_2d(ijk)
+    return np.all((ijk >= 0) & (ijk < np.asarray(dims)), axis=1)
+
+
+# ==========================================================
+#   IJK / POINT ID
+# ==========================================================
+def imageXToIJK(vtiObj, X):
+    """Nearest voxel ijk (int) of image coordinates X - as vtkImageData.FindPoint (may be outside image)"""
+    return np.floor(imageXToContinuousIJK(vtiObj, X) + 0.5).astype(np.int64)
+
+
+def ijkToPointID(dims, ijk):
+    """Point ID of voxel ijk (F order, as vtkImageData) - -1 where outside dims"""
+    ijk, SINGLE = _asPoints(ijk)
+    ijk = ijk.astype(np.int64)
+    dims = np.asarray(dims, dtype=np.int64)
+    ids = ijk[:, 0] + dims[0] * (ijk[:, 1] + dims[1] * ijk[:, 2])
+    ids[~isInside(dims, ijk)] = -1
+    return _asReturned(ids, SINGLE)
+
+
+def pointIDToIJK(dims, ptIDs):
+    """Voxel ijk (int, (N,3)) of point IDs"""
+    ptIDs = np.asarray(ptIDs, dtype=np.int64)
+    SINGLE = (ptIDs.ndim == 0)
+    ptIDs = np.atleast_1d(ptIDs)
+    dims = np.asarray(dims, dtype=np.int64)
+    ijk = np.stack([ptIDs % dims[0], (ptIDs // dims[0]) % dims[1], ptIDs // (dims[0] * dims[1])], axis=1)
+    return _asReturned(ijk, SINGLE)
+
+
+def imageXToPointID(vtiObj, X):
+    """Point ID of nearest voxel to image coordinates X - -1 if outside (as vtkImageData.FindPoint)"""
+    return ijkToPointID(vtiObj.GetDimensions(), imageXToIJK(vtiObj, X))
+
+
+def imageXToStructuredIJK(vtiObj, X):
+    """(ijk, inside) of cell containing image coordinates X - as vtkImageData.ComputeStructuredCoordinates
+    ijk = floor(d / spacing), a point on the upper bound is in the last cell"""
+    X, SINGLE = _asPoints(X)
+    dims, _, _, _ = getGeometry(vtiObj)
+    c = np.atleast_2d(imageXToContinuousIJK(vtiObj, X))
+    inside = np.all((c >= 0) & (c <= (dims - 1)), axis=1)
+    ijk = np.floor(c).astype(np.int64)
+    ijk = np.where((ijk >= dims - 1) & (dims > 1), dims - 2, ijk) # Upper bound -> last cell
+    ijk = np.where(dims > 1, ijk, 0)
+    return _asReturned(ijk, SINGLE), _asReturned(inside, SINGLE)
+
+
+# ==========================================================
+#   PATIENT COORDINATES
+# ==========================================================
+def ijkToPatient(patientMeta, ijk):
+    """Patient coordinates of voxel index ijk (int or float)"""
+    ijk, SINGLE = _asPoints(ijk)
+    M = np.asarray(patientMeta.getMatrix(), dtype=float)
+    return _asReturned(ijk.dot(M[:3, :3].T) + M[:3, 3], SINGLE)
+
+
+def patientToIJK(patientMeta, X):
+    """Continuous (float) voxel index of patient coordinates X"""
+    X, SINGLE = _asPoints(X)
+    M = np.asarray(patientMeta.getMatrix(), dtype=float)
+    return _asReturned(np.linalg.solve(M[:3, :3], (X - M[:3, 3]).T).T, SINGLE)
+
+
+def imageXToPatient(vtiObj, patientMeta, X):
+    """Patient coordinates of the cell (ijk as imageXToStructuredIJK) containing image coordinates X
+    Returns (X_patient, inside) - X_patient is nan where outside"""
+    ijk, inside = imageXToStructuredIJK(vtiObj, X)
+    X_patient = np.atleast_2d(ijkToPatient(patientMeta, ijk)).copy()
+    X_patient[~np.atleast_1d(inside)] = np.nan
+    return _asReturned(X_patient, np.ndim(inside) == 0), inside
+
+
+def patientToImageX(vtiObj, patientMeta, X):
+    """Image coordinates of the voxel (truncated ijk, clipped to image) at patient coordinates X"""
+    ijk = patientToIJK(patientMeta, X).astype(np.int64)
+    ijk = np.clip(ijk, 0, np.asarray(vtiObj.GetDimensions()) - 1)
+    return ijkToImageX(vtiObj, ijk)
+
+
+# ==========================================================
+#   SAMPLING
+# ==========================================================
+def valuesAtImageX(vtiObj, X, arrayName, fillValue=np.nan):
+    """Values of arrayName at nearest voxel to each image coordinate X - fillValue outside
+    Returns (N,) for single component arrays else (N, nComponents)"""
+    from vtk.util import numpy_support # type: ignore
+    X, SINGLE = _asPoints(X)
+    A = numpy_support.vtk_to_numpy(vtiObj.GetPointData().GetArray(arrayName))
+    ptIDs = np.atleast_1d(imageXToPointID(vtiObj, X))
+    values = np.full((len(ptIDs),) + A.shape[1:], fillValue, dtype=np.result_type(A.dtype, np.float32))
+    values[ptIDs >= 0] = A[ptIDs[ptIDs >= 0]]
+    return _asReturned(values, SINGLE)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Parallel DICOM loading for tui.
+
+Headers are read and pixel data decoded in a thread pool. For standard 2D slice
+based series (cine, 4D flow) each timestep is assembled straight into a
+preallocated numpy buffer and wrapped (no copy) as vtkImageData. Geometry and
+field data follow spydcmtk.dcmTK.DicomSeries.buildVTIDict.
+
+After a first load a sidecar cache (raw voxels + geometry and field data) is
+written next to the DICOM directory. The cache is keyed by a
+fingerprint of file names, sizes and modification times and is reopened as a
+memory map.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pydicom
+import vtk
+from vtk.util import numpy_support # type: ignore
+from spydcmtk import dcmTK, dcmTools, dcmVTKTK
+
+logger = logging.getLogger(__name__)
+
+N_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.tuicache'
+CACHE_VOXELS = 'voxels.npy'
+CACHE_META = 'meta.json'
+USER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'tui')
+
+
+def _listDicomFiles(dicomDir):
+    """Files under dicomDir using the same filters as spydcmtk.dcmTools.organiseDicomHeirarchyByUIDs"""
+    if os.path.isfile(dicomDir):
+        return [dicomDir]
+    fileList = []
+    for thisFile in dcmTools.walkdir(dicomDir):
+        if 'dicomdir' in os.path.split(thisFile)[1].lower():
+            continue
+        if thisFile.endswith('json'):
+            continue
+        fileList.append(thisFile)
+    return sorted(fileList)
+
+
+def _readFileToDict(fileName):
+    try:
+        return dcmTools.readDicomFile_intoDict(fileName, {})
+    except (pydicom.errors.InvalidDicomError, AttributeError):
+        return {}
+
+
+def _reportProgress(progressFunc, message, nDone, nTotal):
+    if progressFunc is not None:
+        progressFunc(message, nDone, nTotal)
+
+
+def readDicomSeries(dicomDir, nWorkers=N_WORKERS, progressFunc=None):
+    """Read all DICOM files under dicomDir in a thread pool and return a DicomSeries
+
+    progressFunc - optional callable(message, nDone, nTotal), called on the calling thread
+    """
+    fileList = _listDicomFiles(dicomDir)
+    nFiles = len(fileList)
+    dicomDict = {}
+    with ThreadPoolExecutor(max_workers=nWorkers) as executor:
+        futures = [executor.submit(_readFileToDict, iFile) for iFile in fileList]
+        for k1, iFuture in enumerate(as_completed(futures)):
+            for iStudyUID, seriesDict in iFuture.result().items():
+                for iSeriesUID, dsList in seriesDict.items():
+                    dicomDict.setdefault(iStudyUID, {}).setdefault(iSeriesUID, []).extend(dsList)
+            _reportProgress(progressFunc, "Reading DICOM headers", k1+1, nFiles)
+    return dcmTK.DicomSeries._setFromDictionary(dicomDict)
+
+
+def _isSliceBasedSeries(dcmSeries):
+    """True for the standard 2D slice (optionally + time) layout handled by the fast path"""
+    if dcmSeries.isPhilips4DFlow():
+        return False
+    return not dcmSeries.has3DPixelData()
+
+
+def buildVTIDictFromSeries(dcmSeries, nWorkers=N_WORKERS, progressFunc=None):
+    """Build {time: vtkImageData} from a DicomSeries, decoding pixel data in a thread pool
+
+    Returns vtiDict, the (N, K, Rows, Cols) buffer holding the voxels and the PatientMeta
+    (buffer, PatientMeta are None if the series is not slice based and spydcmtk was used directly)
+    """
+    if not _isSliceBasedSeries(dcmSeries):
+        logger.info("3D / multiframe DICOM - using spydcmtk buildVTIDict")
+        return dcmSeries.buildVTIDict(), None, None
+    nRows, nCols = int(dcmSeries.getTag('Rows')), int(dcmSeries.getTag('Columns'))
+    K = int(dcmSeries.getNumberOfSlicesPerVolume())
+    dcmSeries.sortBySlice_InstanceNumber() # slices grouped, then time for each slice
+    N = int(dcmSeries.getNumberOfTimeSteps())
+    if (K*N) != len(dcmSeries):
+        raise FileNotFoundError(f"Missing some DICOM files. {K}*{N}!={len(dcmSeries)}")
+    # One contiguous block per timestep: flat (Fortran, VTK) order of [Cols, Rows, K] == C order of [K, Rows, Cols]
+    # Native pixel dtype (as spydcmtk getPixelDataAsNumpy) - any narrowing is left to the dtype policy
+    buffer = np.empty((N, K, nRows, nCols), dtype=dcmSeries[0].pixel_array.dtype)
+
+    def _decode(c0):
+        k1, k2 = divmod(c0, N)
+        buffer[k2, k1] = dcmSeries[c0].pixel_array
+        return c0
+
+    with ThreadPoolExecutor(max_workers=nWorkers) as executor:
+        futures = [executor.submit(_decode, c0) for c0 in range(len(dcmSeries))]
+        for k1, iFuture in enumerate(as_completed(futures)):
+            iFuture.result()
+            _reportProgress(progressFunc, "Decoding DICOM pixel data", k1+1, len(futures))
+    patientMeta = dcmVTKTK.PatientMeta()
+    patientMeta.initFromDicomSeries(dcmSeries, (nCols, nRows, K, N))
+    return buildVTIDictFromBuffer(buffer, patientMeta, dcmSeries[0]), buffer, patientMeta
+
+
+def buildVTIDictFromBuffer(buffer, patientMeta, ds=None):
+    """Wrap a (N, K, Rows, Cols) voxel buffer as {time: vtkImageData} without copying voxels
+
+    Geometry and field data are taken from spydcmtk arrToVTI run on the first timestep only
+    """
+    N, K, nRows, nCols = buffer.shape
+    A0 = np.transpose(buffer[0], axes=[2,1,0])[..., np.newaxis] # [Cols, Rows, K, 1]
+    template = list(dcmVTKTK.arrToVTI(A0, patientMeta, ds).values())[0]
+    scalarName = template.GetPointData().GetScalars().GetName()
+    times = patientMeta.Times
+    vtiDict = {}
+    for k1 in range(N):
+        try:
+            thisTime = times[k1]
+        except (IndexError, KeyError):
+            thisTime = k1
+        vtiDict[thisTime] = _wrapTimestep(template, buffer[k1], scalarName, thisTime)
+    return vtiDict
+
+
+def _wrapTimestep(template, A, scalarName, thisTime):
+    newImg = vtk.vtkImageData()
+    newImg.CopyStructure(template)
+    newImg.GetFieldData().DeepCopy(template.GetFieldData())
+    if newImg.GetFieldData().GetArray('Time') is not None:
+        newImg.GetFieldData().RemoveArray('Time')
+        tagArray = numpy_support.numpy_to_vtk(np.array(thisTime))
+        tagArray.SetName('Time')
+        newImg.GetFieldData().AddArray(tagArray)
+    aArray = numpy_support.numpy_to_vtk(A.reshape(-1), deep=0)
+    aArray.SetName(scalarName)
+    newImg.GetPointData().SetScalars(aArray) # numpy_to_vtk keeps a reference to A
+    return newImg
+
+
+def loadDicomDirToVTIDict(dicomDir, nWorkers=N_WORKERS, progressFunc=None, USE_CACHE=True):
+    """Read a DICOM directory (or single file) to {time: vtkImageData} using a thread pool
+
+    USE_CACHE - reopen from (or write) the sidecar cache for this directory
+    """
+    fingerprint = None
+    if USE_CACHE:
+        fingerprint = getDirectoryFingerprint(dicomDir)
+        vtiDict = readCache(dicomDir, fingerprint)
+        if vtiDict is not None:
+            return vtiDict
+    dcmSeries = readDicomSeries(dicomDir, nWorkers=nWorkers, progressFunc=progressFunc)
+    vtiDict, buffer, _ = buildVTIDictFromSeries(dcmSeries, nWorkers=nWorkers, progressFunc=progressFunc)
+    if USE_CACHE:
+        # Voxels and meta are taken now (the caller may replace the arrays, e.g. dtype policy),
+        # files are written in the background - the viewer does not wait for it
+        try:
+            meta, buffer = _getCacheContents(vtiDict, fingerprint, buffer)
+            threading.Thread(target=_writeCacheContents, args=(dicomDir, meta, buffer),
+                             name='tuiDicomCache').start()
+        except Exception as e:
+            logger.error("Error writing DICOM cache: %s", e)
+    return vtiDict
+
+
+# ==========================================================
+#   SIDECAR CACHE
+# ==========================================================
+def getDirectoryFingerprint(dicomDir):
+    """Hash of relative file names, sizes and modification times of all DICOM files"""
+    hasher = hashlib.sha1()
+    hasher.update(str(CACHE_VERSION).encode())
+    rootDir = dicomDir if os.path.isdir(dicomDir) else os.path.dirname(dicomDir)
+    for iFile in _listDicomFiles(dicomDir):
+        stat = os.stat(iFile)
+        hasher.update(("%s|%d|%d\n"%(os.path.relpath(iFile, rootDir), stat.st_size, stat.st_mtime_ns)).encode())
+    return hasher.hexdigest()
+
+
+def getCacheDirs(dicomDir):
+    """Candidate cache directories: sidecar next to dicomDir, then user cache directory"""
+    dicomDir = os.path.abspath(dicomDir).rstrip(os.sep)
+    parentDir, dirName = os.path.split(dicomDir)
+    pathHash = hashlib.sha1(dicomDir.encode()).hexdigest()[:16]
+    return [os.path.join(parentDir, '.' + dirName + CACHE_SUFFIX),
+            os.path.join(USER_CACHE_DIR, pathHash + CACHE_SUFFIX)]
+
+
+def _fieldDataToJson(vtiObj):
+    fieldData = vtiObj.GetFieldData()
+    outDict = {}
+    for k1 in range(fieldData.GetNumberOfArrays()):
+        iArray = fieldData.GetAbstractArray(k1)
+        if isinstance(iArray, vtk.vtkStringArray):
+            outDict[iArray.GetName()] = {'type': 'string',
+                                         'values': [iArray.GetValue(k2) for k2 in range(iArray.GetNumberOfValues())]}
+        else:
+            A = numpy_support.vtk_to_numpy(iArray)
+            outDict[iArray.GetName()] = {'type': 'numeric', 'dtype': str(A.dtype), 'values': A.tolist()}
+    return outDict
+
+
+def _addFieldDataFromJson(vtiObj, fieldDataDict):
+    for iName, iDict in fieldDataDict.items():
+        if iDict['type'] == 'string':
+            tagArray = vtk.vtkStringArray()
+            tagArray.SetNumberOfValues(len(iDict['values']))
+            for k1, iVal in enumerate(iDict['values']):
+                tagArray.SetValue(k1, iVal)
+        else:
+            tagArray = numpy_support.numpy_to_vtk(np.array(iDict['values'], dtype=iDict['dtype']), deep=1)
+        tagArray.SetName(iName)
+        vtiObj.GetFieldData().AddArray(tagArray)
+
+
+def _toJsonable(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def _getCacheContents(vtiDict, fingerprint, buffer=None):
+    """(meta, voxels) to cache for vtiDict - voxels is buffer if given else a copy stacked from vtiDict"""
+    times = sorted(vtiDict.keys())
+    vti0 = vtiDict[times[0]]
+    scalarName = vti0.GetPointData().GetScalars().GetName()
+    if buffer is None:
+        buffer = np.stack([numpy_support.vtk_to_numpy(vtiDict[iTime].GetPointData().GetArray(scalarName))
+                           for iTime in times])
+    meta = {'version': CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'times': times,
+            'dimensions': list(vti0.GetDimensions()),
+            'spacing': list(vti0.GetSpacing()),
+            'origin': list(vti0.GetOrigin()),
+            'direction': [vti0.GetDirectionMatrix().GetElement(i, j) for i in range(3) for j in range(3)],
+            'scalarName': scalarName,
+            'nComponents': vti0.GetPointData().GetScalars().GetNumberOfComponents(),
+            'fieldData': [_fieldDataToJson(vtiDict[iTime]) for iTime in times]}
+    return meta, buffer
+
+
+def _writeCacheContents(dicomDir, meta, buffer):
+    """Write meta and voxels to the first writable cache directory - returns it or None on failure"""
+    try:
+        for cacheDir in getCacheDirs(dicomDir):
+            tmpDir = None
+            try:
+                parentDir = os.path.dirname(cacheDir)
+                os.makedirs(parentDir, exist_ok=True)
+                tmpDir = tempfile.mkdtemp(prefix='.tuicache_tmp_', dir=parentDir)
+                np.save(os.path.join(tmpDir, CACHE_VOXELS), np.ascontiguousarray(buffer.reshape(len(meta['times']), -1)))
+                with open(os.path.join(tmpDir, CACHE_META), 'w') as fid:
+                    json.dump(meta, fid, default=_toJsonable)
+                if os.path.isdir(cacheDir):
+                    shutil.rmtree(cacheDir)
+                os.rename(tmpDir, cacheDir)
+                logger.info("Written DICOM cache to %s", cacheDir)
+                return cacheDir
+            except OSError as e:
+                logger.debug("Could not write DICOM cache to %s: %s", cacheDir, e)
+                if tmpDir is not None:
+                    shutil.rmtree(tmpDir, ignore_errors=True)
+        logger.warning("Unable to write DICOM cache for %s", dicomDir)
+    except Exception as e:
+        logger.error("Error writing DICOM cache: %s", e)
+    return None
+
+
+def writeCache(dicomDir, vtiDict, fingerprint=None, buffer=None):
+    """Write vtiDict to the sidecar cache for dicomDir - returns cache directory or None on failure
+
+    buffer - optional (N, ...) array already holding the voxels of each timestep contiguously
+    """
+    try:
+        if fingerprint is None:
+            fingerprint = getDirectoryFingerprint(dicomDir)
+        meta, buffer = _getCacheContents(vtiDict, fingerprint, buffer)
+    except Exception as e:
+        logger.error("Error writing DICOM cache: %s", e)
+        return None
+    return _writeCacheContents(dicomDir, meta, buffer)
+
+
+def readCache(dicomDir, fingerprint=None):
+    """Reopen vtiDict (memory mapped voxels) from cache - None if no valid cache"""
+    if fingerprint is None:
+        fingerprint = getDirectoryFingerprint(dicomDir)
+    for cacheDir in getCacheDirs(dicomDir):
+        try:
+            with open(os.path.join(cacheDir, CACHE_META), 'r') as fid:
+                meta = json.load(fid)
+        except (OSError, ValueError):
+            continue
+        if (meta.get('version') != CACHE_VERSION) or (meta.get('fingerprint') != fingerprint):
+            logger.info("DICOM cache at %s is out of date", cacheDir)
+            continue
+        try:
+            voxels = np.load(os.path.join(cacheDir, CACHE_VOXELS), mmap_mode='c') # copy-on-write
+        except (OSError, ValueError) as e:
+            logger.warning("Error reading DICOM cache at %s: %s", cacheDir, e)
+            continue
+        vtiDict = {}
+        for k1, iTime in enumerate(meta['times']):
+            newImg = vtk.vtkImageData()
+            newImg.SetDimensions(meta['dimensions'])
+            newImg.SetSpacing(meta['spacing'])
+            newImg.SetOrigin(meta['origin'])
+            newImg.SetDirectionMatrix(meta['direction'])
+            _addFieldDataFromJson(newImg, meta['fieldData'][k1])
+            A = voxels[k1]
+            if meta['nComponents'] > 1:
+                A = A.reshape(-1, meta['nComponents'])
+            aArray = numpy_support.numpy_to_vtk(A, deep=0)
+            aArray.SetName(meta['scalarName'])
+            newImg.GetPointData().SetScalars(aArray)
+            vtiDict[iTime] = newImg
+        logger.info("Opened DICOM cache %s", cacheDir)
+        return vtiDict
+    return None
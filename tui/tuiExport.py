@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Headless (no Qt / no render window) export of cross section images.
+
+Slices are resliced from the volume with vtkImageReslice, window levelled to
+uint8 with numpy and written as PNG from a pool of worker threads.
+
+Usage:
+    tui export -in volume.pvd -start X Y Z -end X Y Z -n 50 -outDir ./images
+    tui export -in volume.vti -points centerline.vtp -outDir ./images -size 256
+
+or from python:
+    from tui import tuiExport
+    tuiExport.exportImagesBetweenPoints(vtiObj, startPt, endPt, 50, outputDir)
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import vtk
+from ngawari import fIO
+from ngawari import vtkfilters
+from tui import tuiUtils
+
+logger = logging.getLogger(__name__)
+
+N_WORKERS = min(8, os.cpu_count() or 1)
+
+
+# ==========================================================
+#   IMAGE CONVERSION / WRITING
+# ==========================================================
+def sliceToUint8(resliceVTI, window, level, arrayName=None):
+    """2D reslice output -> uint8 numpy array (rows, cols) oriented as the viewers save images"""
+    dims = resliceVTI.GetDimensions()
+    if arrayName is None:
+        arrayName = vtkfilters.getScalarsArrayName(resliceVTI)
+    A = vtkfilters.getArrayAsNumpy(resliceVTI, arrayName)
+    A = tuiUtils.windowLevelToUint8(A, window, level) # Any dtype -> 0-255
+    A = np.reshape(A, (dims[0], dims[1]), order='F')
+    return np.rot90(A, 1)
+
+
+def writePNG(A, fileName, size=None):
+    """Write uint8 2D array to PNG - if size (int or [w,h]) given, downsize to fit keeping aspect"""
+    from PIL import Image
+    img = Image.fromarray(np.ascontiguousarray(A))  # uses mode='L'
+    if size is not None:
+        try:
+            size[1]
+        except (TypeError, IndexError):
+            size = [size, size]
+        wh = img.size
+        whMaxID = np.argmax(wh)
+        ratios = [wh[0] / wh[whMaxID], wh[1] / wh[whMaxID]]
+        if wh[whMaxID] > max(size):
+            sizeN = [size[0] * ratios[0], size[1] * ratios[1]]
+            img = img.resize((int(sizeN[0]), int(sizeN[1])))
+    img.save(fileName)
+    return fileName
+
+
+# ==========================================================
+#   RESLICE
+# ==========================================================
+def getDefaultWindowLevel(vtiObj, arrayName=None):
+    """Window, level from 2nd - 98th percentile of arrayName (default active scalars)"""
+    if arrayName is None:
+        arrayName = vtkfilters.getScalarsArrayName(vtiObj)
+    A = vtkfilters.getArrayAsNumpy(vtiObj, arrayName)
+    p2, p98 = np.percentile(A, [2, 98])
+    return p98 - p2, (p2 + p98) / 2.0
+
+
+def resliceAtPoint(vtiObj, center, normal, guidingVector=None, arrayName=None, LINEAR=True):
+    """2D vtkImageData of vtiObj through center with normal (axes as tuiUtils.defineReslice)"""
+    normal = np.array(normal, dtype=float)
+    normal = normal / np.linalg.norm(normal)
+    u, v = tuiUtils.getResliceAxes(normal, guidingVector)
+    reslice = vtk.vtkImageReslice()
+    if (arrayName is not None) and (arrayName != vtkfilters.getScalarsArrayName(vtiObj)):
+        vtiObj = _withActiveScalars(vtiObj, arrayName)
+    reslice.SetInputData(vtiObj)
+    reslice.SetOutputDimensionality(2)
+    reslice.SetResliceAxesDirectionCosines(u, v, normal)
+    reslice.SetResliceAxesOrigin(center)
+    if LINEAR:
+        reslice.SetInterpolationModeToLinear()
+    else:
+        reslice.SetInterpolationModeToNearestNeighbor()
+    reslice.Update()
+    ii = vtk.vtkImageData()
+    ii.DeepCopy(reslice.GetOutput())
+    return ii
+
+
+def _withActiveScalars(vtiObj, arrayName):
+    ii = vtk.vtkImageData()
+    ii.ShallowCopy(vtiObj)
+    ii.GetPointData().SetActiveScalars(arrayName)
+    return ii
+
+
+def getNormalsAlongPoints(points):
+    """Unit tangent at each point of a polyline (central differences)"""
+    points = np.asarray(points, dtype=float)
+    normals = np.gradient(points, axis=0)
+    return normals / np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
+
+# ==========================================================
+#   EXPORT
+# ==========================================================
+def exportImagesAtPoints(vtiObj, centers, normals, outputDir, outputPrefix='', window=None, level=None,
+                         size=None, arrayName=None, nWorkers=N_WORKERS):
+    """Write one PNG per (center, normal) to outputDir as <outputPrefix><k>.png
+    Reslicing runs in this thread; conversion and PNG encoding run on nWorkers threads.
+    Returns list of file names written"""
+    if arrayName is None:
+        arrayName = vtkfilters.getScalarsArrayName(vtiObj)
+    elif arrayName != vtkfilters.getScalarsArrayName(vtiObj):
+        vtiObj = _withActiveScalars(vtiObj, arrayName)
+    if (window is None) or (level is None):
+        w, l = getDefaultWindowLevel(vtiObj, arrayName)
+        window = w if window is None else window
+        level = l if level is None else level
+    os.makedirs(outputDir, exist_ok=True)
+    logger.info("Exporting %d images to %s (w=%s, l=%s)", len(centers), outputDir, window, level)
+    fileOutList = []
+    with ThreadPoolExecutor(max_workers=max(1, nWorkers), thread_name_prefix='tuiExport') as executor:
+        futures = []
+        for k1, (cp, nn) in enumerate(zip(centers, normals)):
+            ii = resliceAtPoint(vtiObj, cp, nn, arrayName=arrayName)
+            fOut = os.path.join(outputDir, f'{outputPrefix}{k1}.png')
+            futures.append(executor.submit(_writeSlice, ii, fOut, window, level, size))
+            fileOutList.append(fOut)
+        for iFuture in futures:
+            iFuture.result()
+    return fileOutList
+
+
+def _writeSlice(resliceVTI, fileName, window, level, size):
+    return writePNG(sliceToUint8(resliceVTI, window, level), fileName, size)
+
+
+def exportImagesBetweenPoints(vtiObj, startPt, endPt, nImages, outputDir, **kwargs):
+    """Write nImages cross sections (normal along the line) from startPt to endPt - see exportImagesAtPoints"""
+    imageLine = vtkfilters.buildPolyLineBetweenTwoPoints(startPt, endPt, nImages)
+    allCP = vtkfilters.getPtsAsNumpy(imageLine)
+    normal = np.array(endPt, dtype=float) - np.array(startPt, dtype=float)
+    return exportImagesAtPoints(vtiObj, allCP, [normal] * len(allCP), outputDir, **kwargs)
+
+
+def exportImagesAlongPoints(vtiObj, points, outputDir, **kwargs):
+    """Write a cross section at each point of a polyline (normal along the line) - see exportImagesAtPoints"""
+    return exportImagesAtPoints(vtiObj, points, getNormalsAlongPoints(points), outputDir, **kwargs)
+
+
+# ==========================================================
+#   INPUT
+# ==========================================================
+def readVolume(inputPath, timeID=0):
+    """Read a single timestep volume from image file / PVD / DICOM directory"""
+    if os.path.isdir(inputPath):
+        from tui import tuiDicom
+        vtiDict = tuiDicom.loadDicomDirToVTIDict(inputPath)
+    else:
+        from tui import tuiMemmap
+        fileDict = fIO.readPVDFileName(inputPath)
+        if len(fileDict) > 1: # Only read requested timestep
+            vtiDict = {timeID: tuiMemmap.readVTKFileMemmap(fileDict[sorted(fileDict.keys())[timeID]])}
+            timeID = 0
+        else:
+            vtiDict = tuiMemmap.readImageFileMemmapToDict(inputPath)
+            if vtiDict is None:
+                vtiDict = fIO.readImageFileToDict(inputPath)
+    times = sorted(vtiDict.keys())
+    vtiObj = vtiDict[times[timeID]]
+    vtkfilters.ensureScalarsSet(vtiObj)
+    return vtiObj
+
+
+def readPoints(pointsFile):
+    """Points (N,3) from a VTK polydata file (.vtp, .vtk, PVD -> first time) or a text / csv file of x y z"""
+    if pointsFile.lower().endswith('.pvd'):
+        fileDict = fIO.readPVDFileName(pointsFile)
+        pointsFile = fileDict[sorted(fileDict.keys())[0]]
+    if os.path.splitext(pointsFile)[1].lower() in ['.vtp', '.vtk']:
+        return vtkfilters.getPtsAsNumpy(fIO.readVTKFile(pointsFile))
+    delimiter = ',' if pointsFile.lower().endswith('.csv') else None
+    return np.atleast_2d(np.loadtxt(pointsFile, delimiter=delimiter))[:, :3]
+
+
+# ==========================================================
+#   CLI
+# ==========================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='tui export', description='Headless export of cross section images',
+                                 formatter_class=argparse.RawTextHelpFormatter)
+    groupR = ap.add_argument_group('Export parameters')
+    groupR.add_argument('-in', dest='inputFile', help='Volume [.pvd, .vti, .mha, .nii, directory of DICOM files]',
+                        type=str, required=True)
+    groupR.add_argument('-outDir', dest='outputDir', help='Directory to write images to', type=str, required=True)
+    groupR.add_argument('-start', dest='startPt', help='Start point X Y Z', type=float, nargs=3, default=None)
+    groupR.add_argument('-end', dest='endPt', help='End point X Y Z', type=float, nargs=3, default=None)
+    groupR.add_argument('-n', dest='nImages', help='Number of images between start and end (default 50)', type=int, default=50)
+    groupR.add_argument('-points', dest='pointsFile',
+                        help='Points file [.vtp, .txt, .csv]: 2 points = start, end. More = image at each point',
+                        type=str, default=None)
+    groupR.add_argument('-prefix', dest='outputPrefix', help='Image file name prefix', type=str, default='')
+    groupR.add_argument('-Scalar', dest='Scalar', help='Array to export (default active scalars)', type=str, default=None)
+    groupR.add_argument('-timeID', dest='timeID', help='Time index of 4D data (default 0)', type=int, default=0)
+    groupR.add_argument('-window', dest='window', help='Window (default 2nd-98th percentile)', type=float, default=None)
+    groupR.add_argument('-level', dest='level', help='Level (default 2nd-98th percentile)', type=float, default=None)
+    groupR.add_argument('-size', dest='size', help='Max image size in pixels', type=int, default=None)
+    groupR.add_argument('-nWorkers', dest='nWorkers', help='Writer threads (default %d)'%(N_WORKERS), type=int,
+                        default=N_WORKERS)
+    groupR.add_argument('-logLevel', dest='logLevel',
+                        help='Set log level: DEBUG, INFO, WARNING, ERROR (default: INFO)',
+                        type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = ap.parse_args(argv)
+    import tui as _tui_pkg
+    _tui_pkg.configure_logging(level=getattr(logging, args.logLevel.upper()))
+
+    kwargs = {'outputPrefix': args.outputPrefix, 'window': args.window, 'level': args.level,
+              'size': args.size, 'arrayName': args.Scalar, 'nWorkers': args.nWorkers}
+    vtiObj = readVolume(args.inputFile, args.timeID)
+    if args.pointsFile is not None:
+        points = readPoints(args.pointsFile)
+        if len(points) == 2:
+            fileOutList = exportImagesBetweenPoints(vtiObj, points[0], points[1], args.nImages, args.outputDir, **kwargs)
+        else:
+            fileOutList = exportImagesAlongPoints(vtiObj, points, args.outputDir, **kwargs)
+    elif (args.startPt is not None) and (args.endPt is not None):
+        fileOutList = exportImagesBetweenPoints(vtiObj, args.startPt, args.endPt, args.nImages, args.outputDir, **kwargs)
+    else:
+        ap.error("Give -start and -end or -points")
+    logger.info("Written %d images to %s", len(fileOutList), args.outputDir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Frame storage for time resolved (PVD / 4D) image data.
+
+LazyFrameDict behaves like the usual vtiDict ({time: vtkImageData}) but only reads
+a timestep from disk when it is asked for. Decoded frames are held in an LRU
+cache limited by size in bytes.
+
+FramePrefetcher reads frames ahead of playback on a worker thread so that cine
+playback does not stall on disk reads.
+
+FrameStreamer reads all frames in time order on a worker thread so that a viewer
+can be set up on the first timestep while the rest arrive (progressive loading).
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+import math
+import queue
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from ngawari import fIO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 2 * 1024**3
+PREFETCH_LOOKAHEAD_MS = 400 # Playback time to keep decoded ahead of the current frame
+PREFETCH_MAX_FRAMES = 16
+
+
+def getFrameNBytes(vtiObj):
+    """Memory held by a vtkImageData in bytes"""
+    return int(vtiObj.GetActualMemorySize()) * 1024
+
+
+class LazyFrameDict(Mapping):
+    """
+    Read-only mapping of {time: vtkImageData} where each timestep is read on first access.
+
+    fileDict    - {time: fileName} (as returned by fIO.readPVDFileName)
+    maxBytes    - size of LRU cache of decoded frames. The most recently used frame is
+                    always kept, even if it alone exceeds maxBytes
+    prepareFunc - optional callable applied to each frame once after reading (e.g. dtype
+                    conversion, setting active scalars)
+    readFunc    - callable fileName -> vtkImageData (default fIO.readVTKFile)
+    """
+    def __init__(self, fileDict, maxBytes=DEFAULT_CACHE_BYTES, prepareFunc=None, readFunc=None):
+        self.fileDict = dict(fileDict)
+        self.times = sorted(self.fileDict.keys())
+        self.maxBytes = maxBytes
+        self.prepareFunc = prepareFunc
+        self.readFunc = readFunc if readFunc is not None else fIO.readVTKFile
+        self._cache = OrderedDict()
+        self._nBytes = {}
+        self._inFlight = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def fromFile(cls, fileName, **kwargs):
+        """Build from a PVD (or single image) file name - does not read any image data"""
+        return cls(fIO.readPVDFileName(fileName), **kwargs)
+
+    def copy(self, **kwargs):
+        """New (empty cache) store over the same files - kwargs override maxBytes, prepareFunc, readFunc"""
+        params = {'maxBytes': self.maxBytes, 'prepareFunc': self.prepareFunc, 'readFunc': self.readFunc}
+        params.update(kwargs)
+        return self.__class__(self.fileDict, **params)
+
+    # Mapping interface
+    def __getitem__(self, time):
+        while True:
+            with self._lock:
+                if time in self._cache:
+                    self._cache.move_to_end(time)
+                    return self._cache[time]
+                if time not in self.fileDict:
+                    raise KeyError(time)
+                loadingEvent = self._inFlight.get(time, None)
+                if loadingEvent is None: # We read it
+                    loadingEvent = threading.Event()
+                    self._inFlight[time] = loadingEvent
+                    break
+            # Being read by another thread (prefetch) - wait and then take from cache
+            loadingEvent.wait()
+            with self._lock:
+                if time in self._cache:
+                    self._cache.move_to_end(time)
+                    return self._cache[time]
+        try:
+            vtiObj = self._readFrame(time)
+            with self._lock:
+                self._cache[time] = vtiObj
+                self._nBytes[time] = getFrameNBytes(vtiObj)
+                self._evict()
+        finally:
+            with self._lock:
+                self._inFlight.pop(time, None)
+            loadingEvent.set()
+        return vtiObj
+
+    def __iter__(self):
+        return iter(self.times)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __contains__(self, time):
+        return time in self.fileDict
+
+    def _readFrame(self, time):
+        logger.debug("Reading frame at time %s from %s", time, self.fileDict[time])
+        vtiObj = self.readFunc(self.fileDict[time])
+        if self.prepareFunc is not None:
+            self.prepareFunc(vtiObj)
+        return vtiObj
+
+    def _evict(self):
+        while (len(self._cache) > 1) and (self.nBytes > self.maxBytes):
+            time, _ = self._cache.popitem(last=False)
+            self._nBytes.pop(time, None)
+            logger.debug("Evicted frame at time %s from frame cache", time)
+
+    # Cache helpers
+    @property
+    def nBytes(self):
+        """Bytes currently held in the cache"""
+        with self._lock:
+            return sum(self._nBytes.values())
+
+    def setMaxBytes(self, maxBytes):
+        """Set cache size (bytes) - evicts immediately if needed"""
+        with self._lock:
+            self.maxBytes = maxBytes
+            self._evict()
+
+    def framesThatFit(self):
+        """Approximate number of frames the cache can hold (from frames seen so far)"""
+        with self._lock:
+            if len(self._nBytes) == 0:
+                return len(self.times)
+            meanBytes = max(1, sum(self._nBytes.values()) / len(self._nBytes))
+        return max(1, int(self.maxBytes // meanBytes))
+
+    def isLoaded(self, time):
+        """True if frame at time is currently held in memory"""
+        with self._lock:
+            return time in self._cache
+
+    def loadedTimes(self):
+        """Sorted list of times currently held in memory"""
+        with self._lock:
+            return sorted(self._cache.keys())
+
+    def loadedItems(self):
+        """List of (time, vtkImageData) currently held in memory - does not change LRU order"""
+        with self._lock:
+            return [(iTime, self._cache[iTime]) for iTime in sorted(self._cache.keys())]
+
+    def clear(self):
+        """Drop all decoded frames"""
+        with self._lock:
+            self._cache.clear()
+            self._nBytes.clear()
+
+
+class FramePrefetcher:
+    """
+    Read frames of a LazyFrameDict ahead of playback on a single worker thread.
+
+    Requests for frames that are no longer wanted (e.g. playback direction changed)
+    are cancelled if they have not started.
+    """
+    def __init__(self, frameStore):
+        self.frameStore = frameStore
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tuiPrefetch')
+        self._pending = {}
+
+    def getDepth(self, intervalMS):
+        """Number of frames to read ahead for a given frame interval (ms)"""
+        nFrames = int(math.ceil(PREFETCH_LOOKAHEAD_MS / max(1.0, float(intervalMS))))
+        nFrames = min(nFrames, PREFETCH_MAX_FRAMES, len(self.frameStore) - 1)
+        # Keep current frame + prefetched frames within the cache
+        nFrames = min(nFrames, self.frameStore.framesThatFit() - 1)
+        return max(0, nFrames)
+
+    def prefetchFrom(self, timeID, direction=1, intervalMS=100, LOOP=True):
+        """Queue the frames following timeID in the direction of playback"""
+        times = self.frameStore.times
+        nTimes = len(times)
+        wantedTimes = []
+        for k in range(1, self.getDepth(intervalMS)+1):
+            iID = timeID + direction*k
+            if LOOP:
+                iID = iID % nTimes
+            elif (iID < 0) or (iID >= nTimes):
+                break
+            wantedTimes.append(times[iID])
+        self.prefetch(wantedTimes)
+
+    def prefetch(self, times):
+        """Queue frames at given times (in order) - cancel queued frames not in times"""
+        for iTime, iFuture in list(self._pending.items()):
+            if iFuture.done() or ((iTime not in times) and iFuture.cancel()):
+                self._pending.pop(iTime)
+        for iTime in times:
+            if (iTime in self._pending) or self.frameStore.isLoaded(iTime):
+                continue
+            self._pending[iTime] = self._executor.submit(self._readFrame, iTime)
+
+    def _readFrame(self, time):
+        try:
+            if not self.frameStore.isLoaded(time):
+                self.frameStore[time]
+        except Exception as e:
+            logger.error("Error prefetching frame at time %s: %s", time, e)
+
+    def shutdown(self):
+        """Cancel queued frames and stop the worker"""
+        for iFuture in self._pending.values():
+            iFuture.cancel()
+        self._pending = {}
+        self._executor.shutdown(wait=False)
+
+
+class FrameStreamer:
+    """
+    Read all frames of a {time: fileName} dict in time order on a worker thread.
+
+    Frames are handed back via getReady() (call from the GUI thread) as a list of
+    (time, vtkImageData), always in increasing time order. Frames that fail to read
+    are logged and skipped.
+    """
+    def __init__(self, fileDict, prepareFunc=None, readFunc=None):
+        self.fileDict = dict(fileDict)
+        self.times = sorted(self.fileDict.keys())
+        self.prepareFunc = prepareFunc
+        self.readFunc = readFunc if readFunc is not None else fIO.readVTKFile
+        self.nRead = 0
+        self.nFailed = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def nTotal(self):
+        return len(self.times)
+
+    def start(self):
+        """Start reading on the worker thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='tuiStream', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for iTime in self.times:
+            if self._stop.is_set():
+                break
+            try:
+                vtiObj = self.readFunc(self.fileDict[iTime])
+                if self.prepareFunc is not None:
+                    self.prepareFunc(vtiObj)
+                self._queue.put((iTime, vtiObj))
+            except Exception as e:
+                logger.error("Error streaming frame at time %s: %s", iTime, e)
+                self.nFailed += 1
+            self.nRead += 1
+
+    def getReady(self):
+        """List of (time, vtkImageData) read since last call"""
+        readyList = []
+        while True:
+            try:
+                readyList.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return readyList
+
+    def isDone(self):
+        """True once all frames have been read (or stopped) and handed back"""
+        finished = (self._thread is not None) and (not self._thread.is_alive())
+        return finished and self._queue.empty()
+
+    def stop(self):
+        """Stop reading after the current frame"""
+        self._stop.set()
@@ -13,8 +13,8 @@ Change to ResliceCursorWidget and Markups in 3D space (rather than sliceID etc)
 import logging
 import vtk
 import numpy as np
+from vtk.util import numpy_support # type: ignore
 from ngawari import vtkfilters
-from scipy import ndimage
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +54,26 @@ class Markups(object):
         self.reset()
 
 
+    def extendTimes(self, nTimes):
+        """Add empty markup collections for new timesteps (progressive loading)"""
+        for iType in self.markupsDict.keys():
+            CollectionClass = self.markupsTypesCollections.get(iType, None)
+            for iTimeID in range(self.nTimes, nTimes):
+                self.markupsDict[iType][iTimeID] = CollectionClass() if CollectionClass is not None else []
+        self.nTimes = max(self.nTimes, nTimes)
+
+
+    def hasMarkups(self, timeID=None):
+        """True if any markup exists at timeID (default: at any time)"""
+        for iType in self.markupsDict.keys():
+            for iTimeID, iCollection in self.markupsDict[iType].items():
+                if (timeID is not None) and (iTimeID != timeID):
+                    continue
+                if isinstance(iCollection, (list, MarkupPoints)) and (len(iCollection) > 0):
+                    return True
+        return False
+
+
     def __genEmptyDict(self, CollectionClass):
         if CollectionClass is not None:
             if CollectionClass == MarkupPoints:
@@ -112,9 +132,9 @@ class Markups(object):
                 spline.RemoveAllObservers()
             except:
                 pass
-            # Force render update to ensure widget is visually removed
-            if hasattr(self.parentImageViewer, 'renderWindow'):
-                self.parentImageViewer.renderWindow.Render()
+            # Render update to ensure widget is visually removed (once for all widgets)
+            if hasattr(self.parentImageViewer, 'requestRender'):
+                self.parentImageViewer.requestRender()
         except Exception as e:
             # If there's an error disabling the widget, just continue
             # This prevents crashes if the widget is already destroyed
@@ -206,17 +226,22 @@ class Markups(object):
         return self.markupsDict[Splines][timeID].getSplinePolyData_WorldCS(self.parentImageViewer.imageCS_To_WorldCS_X, nSplinePts)
 
 
-    def getAllPointsActors(self, timeID, pointSize, boundCP=None, boundN=None, bounddx=None, sliceID=None):
-        return self.markupsDict[Points][timeID].getActorForAllPoints(pointSize, boundCP, boundN, bounddx, sliceID=sliceID)
+    def getPointsWithinBoundsMask(self, timeID, CP, N, dx):
+        """Mask of points of timeID within dx of plane(s) through CP - N (3,) gives (nPoints,), N (nPlanes,3) gives (nPlanes, nPoints)"""
+        return self.markupsDict[Points][timeID].getWithinBoundsMask(CP, N, dx)
 
-    def getAllPointsLineActor(self, timeID, lineWidth=3, LOOP=False, boundCP=None, boundN=None, bounddx=None):
-        return self.markupsDict[Points][timeID].getLineActorForAllPoints(lineWidth, LOOP, boundCP, boundN, bounddx)
+    def updatePointsLayer(self, layer, timeID, pointSize, boundCP=None, boundN=None, bounddx=None, sliceID=None, mask=None):
+        """Write points of timeID to a PointGlyphLayer - returns number of points shown"""
+        return self.markupsDict[Points][timeID].updateGlyphLayer(layer, pointSize, boundCP, boundN, bounddx, sliceID=sliceID, mask=mask)
+
+    def getAllPointsLineActor(self, timeID, lineWidth=3, LOOP=False, boundCP=None, boundN=None, bounddx=None, mask=None):
+        return self.markupsDict[Points][timeID].getLineActorForAllPoints(lineWidth, LOOP, boundCP, boundN, bounddx, mask=mask)
 
     def getPolyDataFromPoints(self, timeID):
         return self.markupsDict[Points][timeID].getPolyData()
 
     def getXNumpyFromPoints(self, timeID):
-        return self.markupsDict[Points][timeID].getWorld_np()
+        return self.markupsDict[Points][timeID].getWorld_np().copy()
     
     def getAllPointsForTime(self, timeID):
         """Get all points for a specific time"""
@@ -242,35 +267,116 @@ class Markup(object):
     
 ### ====================================================================================================================
 ### MARKUP - POINTS-LIST
-class MarkupPoints(list):
-    def __init__(self):
-        super(MarkupPoints, self).__init__([])
+class MarkupPoints(object):
+    """
+    Point markups (of one timestep) held column wise in growable numpy arrays.
+    Bulk access (getImage_np, getWorld_np, getColumn) returns read only views of the first len(self) rows -
+    copy to modify or to keep across edits. Indexing / iterating gives MarkupPoint row views (internal use,
+    invalid once a point is removed).
+    Missing values (None on input): nan for float columns, -1 for IDs.
+    """
+    # column name: (shape per point, dtype, missing value)
+    COLUMNS = {'X_image': ((3,), np.float64, np.nan),
+               'X_world': ((3,), np.float64, np.nan),
+               'norm': ((3,), np.float64, np.nan),
+               'timeID': ((), np.int64, -1),
+               'sliceID': ((), np.int64, -1),
+               'colour': ((3,), np.float64, np.nan),
+               'size': ((), np.float64, np.nan)}
+
+    def __init__(self, capacity=16):
         self.lineRGB = [1, 0.5, 0.7]
+        self.nPoints = 0
+        self.nRemoved = 0 # Removals so far - row views from before a removal are stale
+        self.orientations = [] # Any object - not a column
+        self.columns = {}
+        for name, (shape, dtype, missing) in self.COLUMNS.items():
+            self.columns[name] = np.full((capacity,)+shape, missing, dtype=dtype)
+
+    def __len__(self):
+        return self.nPoints
+
+    def __iter__(self):
+        return (MarkupPoint(self, k) for k in range(self.nPoints))
+
+    def __getitem__(self, ID):
+        if isinstance(ID, slice):
+            return [MarkupPoint(self, k) for k in range(self.nPoints)[ID]]
+        return MarkupPoint(self, self.__checkID(ID))
+
+    def __checkID(self, ID):
+        if ID < 0:
+            ID += self.nPoints
+        if (ID < 0) or (ID >= self.nPoints):
+            raise IndexError('Point index out of range')
+        return ID
+
+    def __grow(self):
+        for name, (shape, dtype, missing) in self.COLUMNS.items():
+            extra = np.full((max(16, len(self.columns[name])),)+shape, missing, dtype=dtype)
+            self.columns[name] = np.concatenate([self.columns[name], extra])
+
+    def getColumn(self, name):
+        """Read only view of column name"""
+        view = self.columns[name][:self.nPoints]
+        view.setflags(write=False)
+        return view
+
+    def getValue(self, name, ID):
+        """Value of column name for point ID - None if missing"""
+        value = self.columns[name][ID]
+        missing = self.COLUMNS[name][2]
+        if value.ndim == 0:
+            return None if (value == missing) or (value != value) else value.item()
+        return None if np.all(np.isnan(value)) else value.copy()
+
+    def setValue(self, name, ID, value):
+        self.columns[name][ID] = self.COLUMNS[name][2] if value is None else value
 
     def addPoint(self, X_image, X_world, norm=None, timeID=0, sliceID=0, orientation=None, ptColour=(1,0,0), ptSize=None):
         # X is expected to be in image coordinates
-        point = MarkupPoint(X_image, X_world, norm=norm, timeID=timeID, sliceID=sliceID, orientation=orientation, ptColour=ptColour, ptSize=ptSize)
-        self.append(point)
+        if self.nPoints == len(self.columns['X_image']):
+            self.__grow()
+        ID = self.nPoints
+        self.nPoints += 1
+        for name, value in zip(['X_image', 'X_world', 'norm', 'timeID', 'sliceID', 'colour', 'size'],
+                               [X_image, X_world, norm, timeID, sliceID, ptColour, ptSize]):
+            self.setValue(name, ID, value)
+        self.orientations.append(orientation)
 
     def removePoint(self, ID=-1):
-        self.pop(ID)
+        ID = self.__checkID(ID)
+        for name in self.COLUMNS.keys():
+            column = self.columns[name]
+            column[ID:self.nPoints-1] = column[ID+1:self.nPoints]
+            column[self.nPoints-1] = self.COLUMNS[name][2]
+        self.orientations.pop(ID)
+        self.nPoints -= 1
+        self.nRemoved += 1
 
     def getImage_np(self):
-        return np.array([i.X_image for i in self])
+        return self.getColumn('X_image')
 
     def getWorld_np(self):
-        return np.array([i.X_world for i in self])
+        return self.getColumn('X_world')
 
     def getPolyData(self):
         pp = vtkfilters.buildPolydataFromXYZ(self.getWorld_np())
-        nn = np.array([i.norm for i in self])
-        vtkfilters.setArrayFromNumpy(pp, nn, "normal", SET_VECTOR=True)
+        nn = self.getColumn('norm')
+        if not np.all(np.isnan(nn)): # Points may have no normal (e.g. loaded from polydata)
+            vtkfilters.setArrayFromNumpy(pp, nn, "normal", SET_VECTOR=True)
         return pp
 
+    def getWithinBoundsMask(self, CP, N, delta):
+        """Mask of points within delta of plane through CP with normal N (as ftk.distanceToPlane, N not normalised)
+        N may be (nPlanes,3) - returns (nPlanes, nPoints), one row per plane"""
+        dists = np.dot(np.atleast_2d(np.asarray(N, dtype=float)), (self.getImage_np() - np.asarray(CP, dtype=float)).T)
+        tf = np.abs(dists) < delta
+        return tf if np.ndim(N) > 1 else tf[0]
+
     def getPointsWithinBounds(self, CP, N, delta):
-        dists = [abs(vtkfilters.ftk.distanceToPlane(i, N, CP)) for i in self.getImage_np()]
-        tf = np.array(dists) < delta
-        return [i for iTF,i in zip(tf, self) if iTF]
+        tf = self.getWithinBoundsMask(CP, N, delta)
+        return [MarkupPoint(self, k) for k in np.flatnonzero(tf)]
 
     def getPolyLine(self, LOOP=False):
         if len(self) < 2:
@@ -278,14 +384,16 @@ class MarkupPoints(list):
         pp = vtkfilters.buildPolyLineFromXYZ(self.getWorld_np(), LOOP)
         return pp
 
-    def getPolyLine_ImageCS(self, LOOP=False, boundCP=None, boundN=None, bounddx=None):
+    def getPolyLine_ImageCS(self, LOOP=False, boundCP=None, boundN=None, bounddx=None, mask=None):
+        """Polyline through points (image CS) - mask (or bounds) selects points"""
         if len(self) < 2:
             return None
-        if boundCP is not None:
-            subList = self.getPointsWithinBounds(boundCP, boundN, bounddx)
-            if len(subList) == 0:
+        if (mask is None) and (boundCP is not None):
+            mask = self.getWithinBoundsMask(boundCP, boundN, bounddx)
+        if mask is not None:
+            if not np.any(mask):
                 return None
-            pp = vtkfilters.buildPolyLineFromXYZ(np.array([i.X_image for i in subList]), LOOP)
+            pp = vtkfilters.buildPolyLineFromXYZ(self.getImage_np()[mask], LOOP)
         else:
             pp = vtkfilters.buildPolyLineFromXYZ(self.getImage_np(), LOOP)
         return pp
@@ -305,21 +413,27 @@ class MarkupPoints(list):
         pp = vtkfilters.appendPolyDataList(allData)
         return pp
 
-    def getActorForAllPoints(self, pointSize, boundCP=None, boundN=None, bounddx=None, sliceID=None):
-        pp = self.getAllPointsPolyData_ImageCS(pointSize, boundCP=boundCP, boundN=boundN, bounddx=bounddx, sliceID=sliceID)
-        if (pp is None) or (pp.GetNumberOfPoints() < 1):
-            return None
-        ptMapper = vtk.vtkPolyDataMapper()
-        ptMapper.SetInputData(pp)
-        ptActor = vtk.vtkActor()
-        ptActor.GetProperty().SetColor(self[0].farbe)
-        ptActor.PickableOff()
-        ptActor.SetMapper(ptMapper)
-        return ptActor
+    def updateGlyphLayer(self, layer, pointSize, boundCP=None, boundN=None, bounddx=None, sliceID=None, mask=None):
+        """Write all points to a PointGlyphLayer. Points not in mask, away from the bounding plane or not on sliceID are masked.
+        pointSize=None uses each point's own size. Returns number of points shown"""
+        if len(self) == 0:
+            return layer.clear()
+        if mask is None:
+            if boundCP is not None:
+                mask = self.getWithinBoundsMask(boundCP, boundN, bounddx)
+            elif sliceID is not None:
+                mask = self.getColumn('sliceID') == sliceID
+            else:
+                mask = np.ones(len(self), dtype=bool)
+        if pointSize is None:
+            radii = self.getColumn('size')
+        else:
+            radii = np.full(len(self), pointSize)
+        return layer.update(self.getImage_np(), radii, self.getColumn('colour'), mask)
 
 
-    def getLineActorForAllPoints(self, lineWidth=3, LOOP=False, boundCP=None, boundN=None, bounddx=None):
-        polyLine = self.getPolyLine_ImageCS(LOOP=LOOP, boundCP=boundCP, boundN=boundN, bounddx=bounddx)
+    def getLineActorForAllPoints(self, lineWidth=3, LOOP=False, boundCP=None, boundN=None, bounddx=None, mask=None):
+        polyLine = self.getPolyLine_ImageCS(LOOP=LOOP, boundCP=boundCP, boundN=boundN, bounddx=bounddx, mask=mask)
         if polyLine is None:
             return None
         lineMapper = vtk.vtkPolyDataMapper()
@@ -336,15 +450,39 @@ class MarkupPoints(list):
 
 ### ====================================================================================================================
 ### MARKUP - POINT
-class MarkupPoint(Markup):
-    def __init__(self, X_image, x_world, norm=None, timeID=0, sliceID=0, orientation=None, ptColour=(1,0,0), ptSize=None):
-        Markup.__init__(self, timeID, sliceID, orientation)
-        self.X_image = X_image
-        self.X_world = x_world
-        self.norm = norm
-        self.farbe = ptColour
-        self.rad = ptSize
-        # potential - hold parent
+def _pointColumnProperty(name):
+    return property(lambda self: self.store.getValue(name, self.getID()),
+                    lambda self, value: self.store.setValue(name, self.getID(), value))
+
+
+class MarkupPoint(object):
+    """
+    Row view of point ID in a MarkupPoints store - attributes read / write the store columns.
+    Internal to MarkupPoints (created by indexing / iterating it). Use and drop: once any point
+    is removed from the store the view is stale and raises RuntimeError.
+    """
+    __slots__ = ('store', 'ID', 'nRemoved')
+    X_image = _pointColumnProperty('X_image')
+    X_world = _pointColumnProperty('X_world')
+    norm = _pointColumnProperty('norm')
+    timeID = _pointColumnProperty('timeID')
+    sliceID = _pointColumnProperty('sliceID')
+    farbe = _pointColumnProperty('colour')
+    rad = _pointColumnProperty('size')
+
+    def __init__(self, store, ID):
+        self.store = store
+        self.ID = ID
+        self.nRemoved = store.nRemoved
+
+    def getID(self):
+        if self.nRemoved != self.store.nRemoved:
+            raise RuntimeError('Stale MarkupPoint: points were removed since it was created')
+        return self.ID
+
+    @property
+    def orientation(self):
+        return self.store.orientations[self.getID()]
 
     def getSphereSource_Image(self, ptSize=None):
         if ptSize is None:
@@ -363,6 +501,79 @@ class MarkupPoint(Markup):
         ptActor.SetMapper(ptMapper)
         return ptActor
 
+### ====================================================================================================================
+### MARKUP - POINTS - DISPLAY
+class PointGlyphLayer(object):
+    """
+    Persistent actor showing a set of points as instanced spheres (vtkGlyph3DMapper).
+    One vtkPolyData holds positions, radius, colour and a mask - update writes these
+    in place and hidden points (e.g. away from the slice) are masked, not removed.
+    """
+    def __init__(self, sphereRes=16):
+        self.polyData = vtk.vtkPolyData()
+        points = vtk.vtkPoints()
+        points.SetDataTypeToDouble()
+        self.polyData.SetPoints(points)
+        self.radiusArray = self.__addArray(vtk.vtkFloatArray(), "Radius", 1)
+        self.colourArray = self.__addArray(vtk.vtkUnsignedCharArray(), "Colour", 3)
+        self.maskArray = self.__addArray(vtk.vtkBitArray(), "Mask", 1) # Glyph mapper requires a bit array
+        self._maskBits = np.zeros(1, dtype=np.uint8) # Packed mask, memory shared with maskArray
+        sphere = vtk.vtkSphereSource()
+        sphere.SetRadius(1.0)
+        sphere.SetPhiResolution(sphereRes)
+        sphere.SetThetaResolution(sphereRes)
+        self.mapper = vtk.vtkGlyph3DMapper()
+        self.mapper.SetInputData(self.polyData)
+        self.mapper.SetSourceConnection(sphere.GetOutputPort())
+        self.mapper.OrientOff()
+        self.mapper.ScalingOn()
+        self.mapper.SetScaleModeToScaleByMagnitude()
+        self.mapper.SetScaleArray("Radius")
+        self.mapper.SetScaleFactor(1.0)
+        self.mapper.MaskingOn()
+        self.mapper.SetMaskArray("Mask")
+        self.mapper.SetScalarModeToUsePointFieldData()
+        self.mapper.SelectColorArray("Colour")
+        self.mapper.SetColorModeToDirectScalars()
+        self.mapper.ScalarVisibilityOn()
+        self.actor = vtk.vtkActor()
+        self.actor.SetMapper(self.mapper)
+        self.actor.PickableOff()
+        self.actor.VisibilityOff()
+
+    def __addArray(self, vtkArray, name, nComponents):
+        vtkArray.SetName(name)
+        vtkArray.SetNumberOfComponents(nComponents)
+        self.polyData.GetPointData().AddArray(vtkArray)
+        return vtkArray
+
+    def getNumberOfPoints(self):
+        return self.polyData.GetNumberOfPoints()
+
+    def update(self, X, radii, colours, mask):
+        """Set positions X (N,3), radii (N,), colours (N,3, 0-1) and mask (N,) - returns number shown"""
+        nPts = len(X)
+        if nPts != self.getNumberOfPoints():
+            self.polyData.GetPoints().SetNumberOfPoints(nPts)
+            for iArray in [self.radiusArray, self.colourArray]:
+                iArray.SetNumberOfTuples(nPts)
+            self._maskBits = np.zeros(max(1, (nPts + 7) // 8), dtype=np.uint8)
+            self.maskArray.SetVoidArray(self._maskBits, nPts, 1)
+        nShown = int(np.count_nonzero(mask))
+        if nPts > 0:
+            numpy_support.vtk_to_numpy(self.polyData.GetPoints().GetData())[:] = X
+            numpy_support.vtk_to_numpy(self.radiusArray)[:] = radii
+            numpy_support.vtk_to_numpy(self.colourArray)[:] = np.round(np.asarray(colours, dtype=float) * 255.0)
+            self._maskBits[:] = np.packbits(np.asarray(mask, dtype=bool))
+            for iArray in [self.polyData.GetPoints(), self.radiusArray, self.colourArray, self.maskArray]:
+                iArray.Modified()
+        self.polyData.Modified()
+        self.actor.SetVisibility(nShown > 0)
+        return nShown
+
+    def clear(self):
+        return self.update(np.zeros((0,3)), [], np.zeros((0,3)), [])
+
 ### ====================================================================================================================
 ### MARKUP - SPLINES - LIST
 class MarkupSplines(list):
@@ -446,7 +657,7 @@ class MarkupSpline(Markup, vtk.vtkSplineWidget):
     def getSplinePolyData_WorldCS(self, imageToWorld_func, nSplinePts=100):
         pts = self.getPoints(nSplinePts=nSplinePts) # Note LOOP done here with splining
         # but if self.LOOP  AND we had NO splining - then do loop. 
-        worldCoords = np.array([imageToWorld_func(i, self.sliceID) for i in pts])
+        worldCoords = imageToWorld_func(pts, self.sliceID) # All points in one call
         return vtkfilters.buildPolyLineFromXYZ(worldCoords, LOOP=(self.LOOP and (nSplinePts is None)))
 
     def getPoints(self, nSplinePts=None):
@@ -600,10 +811,12 @@ class MarkupMask(Markup):
         return self.array[:,sliceID,:].flatten('F').astype(int)
 
     def errode(self, structure=None, errodeMask=None, iterations=1):
+        from scipy import ndimage
         self.array = ndimage.binary_erosion(self.array, iterations=iterations, structure=structure, mask=errodeMask).astype(int)
         # self.array[self.array>0]+=1
 
     def dilate(self, structure=None, dilateMask=None, iterations=1):
+        from scipy import ndimage
         self.array = ndimage.binary_dilation(self.array, iterations=iterations, structure=structure, mask=dilateMask).astype(int)
         # self.array[self.array>0]+=1
 
@@ -11,19 +11,27 @@ Super classes for customised use of tui viewer.
 
 import sys
 import os
+import time
 import logging
 import argparse
-from ngawari import fIO
-from ngawari import vtkfilters
-from tui.tuiUtils import dialogGetName
-from tui import tuiViewer
-from tui import tuimarkupui
-from tui import piwakawakamarkupui
-from tui import piwakawakaViewer
+import importlib
 import tui as _tui_pkg
+# NOTE: Qt, VTK, ngawari and the viewers are imported where used so that 'tui -h' and
+#       headless use do not pay for them (see -importTimes)
 
 logger = logging.getLogger(__name__)
 
+# Heavy modules in the order the viewer loads them - for the import time report
+IMPORT_REPORT_MODULES = ['numpy', 'vtk', 'PyQt5.QtWidgets', 'scipy', 'ngawari.fIO', 'ngawari.vtkfilters',
+                         'tui.tuimarkupui', 'tui.tuiUtils', 'tui.tuiMarkups', 'tui.baseMarkupViewer',
+                         'tui.tuiViewer', 'tui.piwakawakamarkupui', 'tui.piwakawakaViewer',
+                         'pydicom', 'spydcmtk', 'tui.tuiDicom', 'scipy.ndimage', 'PIL.Image']
+
+
+
+def dialogGetName(parent, prompt='Enter feature name:'):
+    from tui import tuiUtils
+    return tuiUtils.dialogGetName(parent, prompt)
 
 
 ### ====================================================================================================================
@@ -104,8 +112,9 @@ class TUIProject(_TUIProj):
 
     """
     def __init__(self, app=None, VERBOSE=False):
+        from tui import tuiViewer
         if app is None:
-            app = tuimarkupui.QtWidgets.QApplication(['TUI Image Viewer'])
+            app = tuiViewer.tuimarkupui.QtWidgets.QApplication(['TUI Image Viewer'])
         super().__init__(app)
         self.ex = tuiViewer.TUIMarkupViewer()
         logger.info("TUIProject initialized")
@@ -116,6 +125,7 @@ class TUIProject(_TUIProj):
             logger.setLevel(logging.INFO)
 
     def alignBy_X_Norm(self, X, Norm):
+        from ngawari import vtkfilters
         logger.debug("This is centering but not aligning.")
         norm0 = Norm / vtkfilters.np.linalg.norm(Norm)
         norm1, norm2 = [0, 0, 0], [0, 0, 0]
@@ -136,7 +146,7 @@ class TUIProject(_TUIProj):
         self.ex.resliceCursor.SetYAxis(norm1[0], norm1[1], norm1[2])
         self.ex.resliceCursor.SetZAxis(norm2[0], norm2[1], norm2[2])
         self.ex.resliceCursor.Update()
-        self.ex.renderWindow.Render()
+        self.ex.requestRender()
         logger.debug("Norms: %s %s %s viewNormal=%s", norm0, norm1, norm2, self.ex.getViewNormal(0))
         logger.debug("Cursor axes: X=%s Y=%s Z=%s",
                     self.ex.resliceCursor.GetXAxis(),
@@ -153,8 +163,9 @@ class TUI2DProject(_TUIProj):
 
     """
     def __init__(self, app=None, VERBOSE=False):
+        from tui import piwakawakaViewer
         if app is None:
-            app = piwakawakamarkupui.QtWidgets.QApplication(['PIWAKAWAKA Image Viewer'])
+            app = piwakawakaViewer.piwakawakamarkupui.QtWidgets.QApplication(['PIWAKAWAKA Image Viewer'])
         super().__init__(app)
         self.ex = piwakawakaViewer.PIWAKAWAKAMarkupViewer()
         logger.info("TUI2DProject initialized")
@@ -217,6 +228,7 @@ class TUIBasic(TUIProject):
 
 
     def saveImages_(self):
+        from ngawari import vtkfilters
         pts = self.getLMPoints_xyz()
         VIEW_ID = 2 # TOP LEFT
         self.ex.deleteAllMarkups()
@@ -282,22 +294,29 @@ class TUI2D(TUI2DProject):
 
 ### ====================================================================================================================
 ### ====================================================================================================================
-def launchBasic(inputPath, scalar, workDir):
+def launchBasic(inputPath, scalar, workDir, dtypePolicy=None):
+    from tui import tuimarkupui
     app = tuimarkupui.QtWidgets.QApplication(['TUI Image Viewer'])
     OBJ = TUIBasic(app)
+    if dtypePolicy is not None:
+        OBJ.ex.dtypePolicy = dtypePolicy
     OBJ.setup(inputPath=inputPath, workDir=workDir, scalar=scalar)
     sys.exit(app.exec_())
 
 
-def launch2D(inputPath, scalar, workDir):
+def launch2D(inputPath, scalar, workDir, dtypePolicy=None):
+    from tui import piwakawakamarkupui
     app = piwakawakamarkupui.QtWidgets.QApplication(['PIWAKAWAKA Image Viewer'])
     OBJ = TUI2D(app)
     logger.info("Launching 2D viewer")
+    if dtypePolicy is not None:
+        OBJ.ex.dtypePolicy = dtypePolicy
     OBJ.setup(inputPath=inputPath, workDir=workDir, scalar=scalar)
     sys.exit(app.exec_())
 
 
 def LaunchCustomApp(TUIApp, subjObj):
+    from tui import tuimarkupui
     app = tuimarkupui.QtWidgets.QApplication(['TUI Image Viewer'])
     try:
         OBJ = TUIApp(app)
@@ -309,7 +328,31 @@ def LaunchCustomApp(TUIApp, subjObj):
 
 ### ====================================================================================================================
 ### ====================================================================================================================
-def run(inputFileName, logLevel, scalar=None, workDir=None, TwoD=False):
+def reportImportTimes(moduleNames=None, stream=None):
+    """Import each module in turn and print its import cost (s) - cost of shared dependencies
+    is assigned to the first module that needs them. Returns list of (moduleName, seconds)"""
+    if moduleNames is None:
+        moduleNames = IMPORT_REPORT_MODULES
+    if stream is None:
+        stream = sys.stdout
+    results = []
+    t0 = time.perf_counter()
+    for iName in moduleNames:
+        alreadyLoaded = iName in sys.modules
+        tA = time.perf_counter()
+        try:
+            importlib.import_module(iName)
+            status = 'loaded' if alreadyLoaded else ''
+        except Exception as e:
+            status = 'FAILED: %s'%(e)
+        dt = time.perf_counter() - tA
+        results.append((iName, dt))
+        stream.write("%-28s %8.3f s  %s\n"%(iName, dt, status))
+    stream.write("%-28s %8.3f s\n"%('TOTAL', time.perf_counter() - t0))
+    return results
+
+
+def run(inputFileName, logLevel, scalar=None, workDir=None, TwoD=False, dtypePolicy=None):
     """Launch the TUI viewer.
 
     Args:
@@ -318,30 +361,42 @@ def run(inputFileName, logLevel, scalar=None, workDir=None, TwoD=False):
         scalar: Scalar to display
         workDir: Working directory to save markups
         TwoD: Open 2D viewer
+        dtypePolicy: Data type of arrays after load: native, float32, float64 (default: native)
     """
     _tui_pkg.configure_logging(level=logLevel)
 
     if TwoD:
-        launch2D(inputFileName, scalar, workDir)
+        launch2D(inputFileName, scalar, workDir, dtypePolicy)
     else:
-        launchBasic(inputFileName, scalar, workDir)
+        launchBasic(inputFileName, scalar, workDir, dtypePolicy)
 
 def main():
-    ap = argparse.ArgumentParser(description='Master', formatter_class=argparse.RawTextHelpFormatter)
+    if (len(sys.argv) > 1) and (sys.argv[1] == 'export'): # Headless image export: tui export -h
+        from tui import tuiExport
+        sys.exit(tuiExport.main(sys.argv[2:]))
+    ap = argparse.ArgumentParser(description='Master (headless cross section export: tui export -h)', formatter_class=argparse.RawTextHelpFormatter)
     groupR = ap.add_argument_group('Run parameters')
     groupR.add_argument('-in', dest='inputFile', help='full filename [.pvd, .vti, .png/jpg, .dcm]', type=str, default=None)
     groupR.add_argument('-Scalar', dest='Scalar', help='Set scalar', type=str, default=None)
     groupR.add_argument('-workDir', dest='workDir', help='Working directory to save markups', type=str, default=None)
     groupR.add_argument('-2D', dest='TwoD', help='Open 2D viewer', action='store_true')
+    groupR.add_argument('-dtype', dest='dtypePolicy',
+                        help='Data type of image arrays after load: native, float32, float64 (default: native)',
+                        type=str, default='native',
+                        choices=['native', 'float32', 'float64'])
+    groupR.add_argument('-importTimes', dest='importTimes', help='Print per module import time (startup cost) and exit',
+                        action='store_true')
     groupR.add_argument('-logLevel', dest='logLevel',
                         help='Set log level: DEBUG, INFO, WARNING, ERROR (default: INFO)',
                         type=str, default='INFO',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
 
     args = ap.parse_args()
-    if args.inputFile is not None:
+    if args.importTimes:
+        reportImportTimes()
+    elif args.inputFile is not None:
         log_level = getattr(logging, args.logLevel.upper())
-        run(args.inputFile, log_level, args.Scalar, args.workDir, args.TwoD)
+        run(args.inputFile, log_level, args.Scalar, args.workDir, args.TwoD, args.dtypePolicy)
     else:
         ap.print_help(sys.stderr)
 
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Memory mapped (zero copy) image readers.
+
+Point data arrays wrap a numpy memmap of the file on disk, so voxels are paged in
+by the OS on demand rather than copied into RAM. Supported:
+    - VTI (XML) with raw (not base64, not compressed) appended data
+    - MHA / MHD (+ raw) uncompressed
+    - NIfTI-1 (.nii) uncompressed, little endian. 4D files give one vtkImageData per time
+
+Each reader returns None if the file can not be mapped - use readVTKFileMemmap
+for automatic fallback to the standard VTK readers.
+
+Arrays are mapped copy-on-write: modifying voxels in memory never changes the file.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+import os
+import re
+import numpy as np
+import vtk
+from vtk.util import numpy_support # type: ignore
+from ngawari import fIO
+
+logger = logging.getLogger(__name__)
+
+MMAP_MODE = 'c' # copy-on-write
+
+VTK_XML_TYPES = {'Int8': np.int8, 'UInt8': np.uint8,
+                 'Int16': np.int16, 'UInt16': np.uint16,
+                 'Int32': np.int32, 'UInt32': np.uint32,
+                 'Int64': np.int64, 'UInt64': np.uint64,
+                 'Float32': np.float32, 'Float64': np.float64}
+
+MET_TYPES = {'MET_CHAR': np.int8, 'MET_UCHAR': np.uint8,
+             'MET_SHORT': np.int16, 'MET_USHORT': np.uint16,
+             'MET_INT': np.int32, 'MET_UINT': np.uint32,
+             'MET_LONG': np.int32, 'MET_ULONG': np.uint32,
+             'MET_LONG_LONG': np.int64, 'MET_ULONG_LONG': np.uint64,
+             'MET_FLOAT': np.float32, 'MET_DOUBLE': np.float64}
+
+NIFTI_TYPES = {2: np.uint8, 4: np.int16, 8: np.int32, 16: np.float32, 64: np.float64,
+               256: np.int8, 512: np.uint16, 768: np.uint32, 1024: np.int64, 1280: np.uint64}
+
+
+def _wrapArray(A, name, nComponents=1):
+    if nComponents > 1:
+        A = A.reshape(-1, nComponents)
+    vtkArray = numpy_support.numpy_to_vtk(A, deep=0) # keeps reference to memmap
+    vtkArray.SetName(name)
+    return vtkArray
+
+
+def isMemmapped(vtkArray):
+    """True if vtkArray wraps a numpy memmap"""
+    ref = getattr(vtkArray, '_numpy_reference', None) # Older VTK holds the reference on the array
+    if (ref is None) and hasattr(vtkArray, 'GetBuffer'):
+        ref = getattr(vtkArray.GetBuffer(), '_numpy_reference', None)
+    while ref is not None:
+        if isinstance(ref, np.memmap):
+            return True
+        ref = getattr(ref, 'base', None)
+    return False
+
+
+# ==========================================================
+#   VTI
+# ==========================================================
+def _xmlAttributes(tagText):
+    return dict(re.findall(r'(\w+)="([^"]*)"', tagText))
+
+
+def readVTIMemmap(fileName):
+    """vtkImageData with point arrays memory mapped from VTI appended raw data (None if not possible)"""
+    with open(fileName, 'rb') as fid:
+        head = fid.read(1024*1024)
+    marker = head.find(b'<AppendedData')
+    if marker < 0:
+        return None
+    underscore = head.find(b'_', head.find(b'>', marker))
+    if underscore < 0:
+        return None
+    dataStart = underscore + 1
+    header = head[:marker].decode('utf-8', errors='replace')
+    fileAttr = _xmlAttributes(re.search(r'<VTKFile[^>]*>', header).group(0))
+    appendedAttr = _xmlAttributes(head[marker:head.find(b'>', marker)+1].decode())
+    if ('compressor' in fileAttr) or (appendedAttr.get('encoding', 'raw') != 'raw'):
+        return None
+    if fileAttr.get('byte_order', 'LittleEndian') != 'LittleEndian':
+        return None
+    headerType = np.uint64 if fileAttr.get('header_type', 'UInt32') == 'UInt64' else np.uint32
+    if len(re.findall(r'<Piece', header)) != 1:
+        return None
+    imageAttr = _xmlAttributes(re.search(r'<ImageData[^>]*>', header).group(0))
+    extent = [int(i) for i in imageAttr['WholeExtent'].split()]
+    newImg = vtk.vtkImageData()
+    newImg.SetExtent(extent)
+    newImg.SetOrigin([float(i) for i in imageAttr.get('Origin', '0 0 0').split()])
+    newImg.SetSpacing([float(i) for i in imageAttr.get('Spacing', '1 1 1').split()])
+    if 'Direction' in imageAttr:
+        newImg.SetDirectionMatrix([float(i) for i in imageAttr['Direction'].split()])
+    nPoints = newImg.GetNumberOfPoints()
+
+    def _readAppended(offset, dtype, count):
+        nBytes = int(np.fromfile(fileName, dtype=headerType, count=1, offset=dataStart+offset)[0])
+        if dtype is None: # String array - small, read
+            with open(fileName, 'rb') as fid:
+                fid.seek(dataStart + offset + np.dtype(headerType).itemsize)
+                return fid.read(nBytes)
+        if (count is not None) and (nBytes != count * np.dtype(dtype).itemsize):
+            raise ValueError("Unexpected appended data size")
+        return np.memmap(fileName, dtype=dtype, mode=MMAP_MODE, offset=dataStart+offset+np.dtype(headerType).itemsize,
+                         shape=(nBytes // np.dtype(dtype).itemsize,))
+
+    # Field data (small - copied)
+    fieldMatch = re.search(r'<FieldData>(.*?)</FieldData>', header, re.S)
+    if fieldMatch:
+        for tagText in re.findall(r'<(?:DataArray|Array)[^>]*>', fieldMatch.group(1)):
+            attr = _xmlAttributes(tagText)
+            if attr.get('format') != 'appended':
+                return None
+            if attr['type'] == 'String':
+                values = _readAppended(int(attr['offset']), None, None).split(b'\0')[:int(attr['NumberOfTuples'])]
+                tagArray = vtk.vtkStringArray()
+                tagArray.SetNumberOfValues(len(values))
+                for k1, iVal in enumerate(values):
+                    tagArray.SetValue(k1, iVal.decode('utf-8', errors='replace'))
+                tagArray.SetName(attr['Name'])
+            elif attr['type'] in VTK_XML_TYPES:
+                A = np.array(_readAppended(int(attr['offset']), VTK_XML_TYPES[attr['type']], None))
+                tagArray = _wrapArray(A, attr['Name'], int(attr.get('NumberOfComponents', 1)))
+            else:
+                continue
+            newImg.GetFieldData().AddArray(tagArray)
+    # Point data (mapped)
+    pointMatch = re.search(r'<PointData([^>]*)>(.*?)</PointData>', header, re.S)
+    if pointMatch:
+        scalarsName = _xmlAttributes(pointMatch.group(1)).get('Scalars', None)
+        for tagText in re.findall(r'<DataArray[^>]*>', pointMatch.group(2)):
+            attr = _xmlAttributes(tagText)
+            if (attr.get('format') != 'appended') or (attr['type'] not in VTK_XML_TYPES):
+                return None
+            nComponents = int(attr.get('NumberOfComponents', 1))
+            A = _readAppended(int(attr['offset']), VTK_XML_TYPES[attr['type']], nPoints*nComponents)
+            newImg.GetPointData().AddArray(_wrapArray(A, attr['Name'], nComponents))
+        if scalarsName:
+            newImg.GetPointData().SetActiveScalars(scalarsName)
+    return newImg
+
+
+# ==========================================================
+#   MHA / MHD
+# ==========================================================
+def readMHAMemmap(fileName):
+    """vtkImageData memory mapped from uncompressed MetaImage (None if not possible)"""
+    header = {}
+    with open(fileName, 'rb') as fid:
+        while True:
+            line = fid.readline()
+            if not line:
+                return None
+            key, _, value = line.decode('latin-1').partition('=')
+            header[key.strip()] = value.strip()
+            if key.strip() == 'ElementDataFile':
+                dataOffset = fid.tell()
+                break
+    if header.get('CompressedData', 'False').lower() == 'true':
+        return None
+    if (header.get('BinaryDataByteOrderMSB', header.get('ElementByteOrderMSB', 'False')).lower() == 'true'):
+        return None
+    if header.get('ElementType') not in MET_TYPES:
+        return None
+    dims = [int(i) for i in header['DimSize'].split()]
+    if len(dims) != 3:
+        return None
+    dataFile = header['ElementDataFile']
+    if dataFile == 'LOCAL':
+        dataFile = fileName
+    elif (' ' in dataFile) or (dataFile in ('LIST',)):
+        return None
+    else:
+        dataFile = os.path.join(os.path.dirname(fileName), dataFile)
+        dataOffset = 0
+    headerSize = int(header.get('HeaderSize', 0))
+    if headerSize > 0:
+        dataOffset += headerSize
+    nComponents = int(header.get('ElementNumberOfChannels', 1))
+    dtype = MET_TYPES[header['ElementType']]
+    newImg = vtk.vtkImageData()
+    newImg.SetDimensions(dims)
+    newImg.SetSpacing([float(i) for i in header.get('ElementSpacing', '1 1 1').split()])
+    origin = header.get('Offset', header.get('Origin', header.get('Position', '0 0 0')))
+    newImg.SetOrigin([float(i) for i in origin.split()])
+    A = np.memmap(dataFile, dtype=dtype, mode=MMAP_MODE, offset=dataOffset, shape=(int(np.prod(dims))*nComponents,))
+    newImg.GetPointData().SetScalars(_wrapArray(A, 'MetaImage', nComponents)) # Name as vtkMetaImageReader
+    return newImg
+
+
+# ==========================================================
+#   NIfTI
+# ==========================================================
+def readNIfTIMemmap(fileName):
+    """{time: vtkImageData} memory mapped from uncompressed NIfTI-1 (None if not possible)"""
+    with open(fileName, 'rb') as fid:
+        hdr = fid.read(348)
+    if len(hdr) < 348 or np.frombuffer(hdr, dtype='<i4', count=1)[0] != 348:
+        return None # Not NIfTI-1 or big endian
+    dim = np.frombuffer(hdr, dtype='<i2', count=8, offset=40)
+    datatype = int(np.frombuffer(hdr, dtype='<i2', count=1, offset=70)[0])
+    pixdim = np.frombuffer(hdr, dtype='<f4', count=8, offset=76)
+    voxOffset = int(np.frombuffer(hdr, dtype='<f4', count=1, offset=108)[0])
+    if (datatype not in NIFTI_TYPES) or (dim[0] < 3) or (dim[0] > 4) or (pixdim[0] < 0): # qfac<0: VTK reader reorders slices
+        return None
+    dims = [int(i) for i in dim[1:4]]
+    nT = int(dim[4]) if dim[0] == 4 else 1
+    nPoints = int(np.prod(dims))
+    dtype = np.dtype(NIFTI_TYPES[datatype]).newbyteorder('<')
+    A = np.memmap(fileName, dtype=dtype, mode=MMAP_MODE, offset=voxOffset, shape=(nT, nPoints))
+    dt = float(pixdim[4]) if (nT > 1) and (pixdim[4] > 0) else 1.0
+    vtiDict = {}
+    for k1 in range(nT):
+        newImg = vtk.vtkImageData()
+        newImg.SetDimensions(dims)
+        newImg.SetSpacing([float(i) for i in pixdim[1:4]])
+        newImg.SetOrigin(0.0, 0.0, 0.0) # As vtkNIFTIImageReader - orientation in q/s-form
+        newImg.GetPointData().SetScalars(_wrapArray(A[k1], 'NIFTI'))
+        vtiDict[k1*dt] = newImg
+    return vtiDict
+
+
+# ==========================================================
+#   DISPATCH
+# ==========================================================
+def readImageFileMemmapToDict(fileName):
+    """{time: vtkImageData} memory mapped if the format allows, else None"""
+    fileName_lower = fileName.lower()
+    try:
+        if fileName_lower.endswith('.vti'):
+            vtiObj = readVTIMemmap(fileName)
+            return None if vtiObj is None else {0.0: vtiObj}
+        elif fileName_lower.endswith('.mha') or fileName_lower.endswith('.mhd'):
+            vtiObj = readMHAMemmap(fileName)
+            return None if vtiObj is None else {0.0: vtiObj}
+        elif fileName_lower.endswith('.nii'):
+            return readNIfTIMemmap(fileName)
+    except (OSError, ValueError, KeyError, AttributeError, IndexError) as e:
+        logger.debug("Unable to memory map %s: %s", fileName, e)
+    return None
+
+
+def readVTKFileMemmap(fileName):
+    """As fIO.readVTKFile, but memory mapped where possible (first timestep only for 4D)"""
+    vtiDict = readImageFileMemmapToDict(fileName)
+    if vtiDict is None:
+        logger.debug("Reading %s without memory map", fileName)
+        return fIO.readVTKFile(fileName)
+    return vtiDict[sorted(vtiDict.keys())[0]]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Wall clock scheduling of time animation.
+
+PlaybackScheduler decides which timestep to show next and when. Playback stays in
+step with the wall clock at the requested frame interval: if a frame (update +
+render) takes longer than the interval, frames are skipped rather than delayed, and
+the next frame is scheduled with a single shot timer so that Qt events are always
+processed between frames. The achieved frame rate is measured over a short window.
+
+No Qt here - the viewer owns the timer.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import time
+from collections import deque
+
+FPS_WINDOW_S = 2.0 # Seconds of displayed frames the achieved fps is measured over
+MIN_DELAY_MS = 1 # Always return to the event loop between frames
+
+
+class PlaybackScheduler:
+    """
+    Frame scheduling for looping playback over nFrames at intervalMS per frame.
+
+    Usage (per timer tick):
+        frameID = scheduler.nextFrameID(currentFrameID, nFrames)
+        ... show frameID ...
+        scheduler.frameShown(cost)
+        timer.start(scheduler.getDelayMS())
+    """
+    def __init__(self, intervalMS, clock=time.perf_counter):
+        self.clock = clock
+        self.intervalMS = float(intervalMS)
+        self.frameCostMS = 0.0 # Exponential moving average of update + render time
+        self.nShown = 0
+        self.nSkipped = 0
+        self._shownTimes = deque()
+        self.restart()
+
+    def restart(self, intervalMS=None):
+        """Restart the playback clock (e.g. on start or speed change)"""
+        if intervalMS is not None:
+            self.intervalMS = float(intervalMS)
+        self._t0 = self.clock()
+        self._nTicks = 0 # Frame intervals elapsed since _t0 that have been shown (or skipped)
+        self._shownTimes.clear()
+
+    def nextFrameID(self, currentFrameID, nFrames):
+        """Frame to show now - skips frames if playback has fallen behind the wall clock"""
+        due = int((self.clock() - self._t0) * 1000.0 / self.intervalMS)
+        step = max(1, due - self._nTicks)
+        self.nSkipped += step - 1
+        self._nTicks += step
+        if nFrames <= 0:
+            return 0
+        return (currentFrameID + step) % nFrames
+
+    def frameShown(self, costS):
+        """Record a displayed frame that took costS seconds to update and render"""
+        now = self.clock()
+        self.nShown += 1
+        costMS = costS * 1000.0
+        self.frameCostMS = costMS if self.nShown == 1 else (0.8 * self.frameCostMS + 0.2 * costMS)
+        self._shownTimes.append(now)
+        while (len(self._shownTimes) > 2) and (now - self._shownTimes[0] > FPS_WINDOW_S):
+            self._shownTimes.popleft()
+
+    def getDelayMS(self):
+        """Milliseconds until the next frame is due (at least MIN_DELAY_MS)"""
+        nextDueMS = (self._nTicks + 1) * self.intervalMS
+        return int(max(MIN_DELAY_MS, nextDueMS - (self.clock() - self._t0) * 1000.0))
+
+    @property
+    def targetFPS(self):
+        return 1000.0 / self.intervalMS
+
+    @property
+    def achievedFPS(self):
+        """Displayed frames per second over the last FPS_WINDOW_S (0 until two frames shown)"""
+        if len(self._shownTimes) < 2:
+            return 0.0
+        dt = self._shownTimes[-1] - self._shownTimes[0]
+        return (len(self._shownTimes) - 1) / dt if dt > 0 else 0.0
+
+    def getStatusString(self):
+        return "%.1f/%.0f fps"%(self.achievedFPS, self.targetFPS)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Multi-resolution image pyramid for responsive interaction on large volumes.
+
+Each level is a block-averaged copy (2x, 4x, ...) of the active scalars of a
+timestep, covering the same physical region. Levels are built on a worker thread
+and held in a small LRU cache keyed by time so that reslicing can use a coarse
+level while the user drags the reslice cursor.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import vtk
+from vtk.util import numpy_support # type: ignore
+from ngawari import vtkfilters
+
+logger = logging.getLogger(__name__)
+
+PYRAMID_FACTORS = (2, 4)
+PYRAMID_MIN_VOXELS = 16e6 # Smaller images reslice fast enough at full resolution
+PYRAMID_INTERACTION_VOXELS = 16e6 # Target voxel count of level used while interacting
+PYRAMID_CACHE_BYTES = 512 * 1024**2
+
+
+def getNVoxels(vtiObj):
+    dims = [0,0,0]
+    vtiObj.GetDimensions(dims)
+    return int(np.prod(dims))
+
+
+def buildPyramidLevel(vtiObj, factor, arrayName=None):
+    """Block average arrayName (default active scalars) of vtiObj by factor along each axis
+    Axes with fewer than factor points are left at full resolution.
+    Returns vtkImageData holding only the averaged array (same dtype, same name)"""
+    if arrayName is None:
+        arrayName = vtkfilters.getScalarsArrayName(vtiObj)
+    dims = [0,0,0]
+    vtiObj.GetDimensions(dims)
+    factors = [factor if dims[i] >= factor else 1 for i in range(3)]
+    newDims = [dims[i] // factors[i] for i in range(3)]
+    vtkArray = vtiObj.GetPointData().GetArray(arrayName)
+    nComp = vtkArray.GetNumberOfComponents()
+    A = numpy_support.vtk_to_numpy(vtkArray).reshape(dims[2], dims[1], dims[0], nComp)
+    A = A[:newDims[2]*factors[2], :newDims[1]*factors[1], :newDims[0]*factors[0]]
+    A = A.reshape(newDims[2], factors[2], newDims[1], factors[1], newDims[0], factors[0], nComp)
+    A = A.mean(axis=(1, 3, 5), dtype=np.float32).astype(A.dtype)
+    #
+    spacing = np.array(vtiObj.GetSpacing())
+    directionMatrix = vtiObj.GetDirectionMatrix()
+    D = np.array([[directionMatrix.GetElement(i, j) for j in range(3)] for i in range(3)])
+    origin = np.array(vtiObj.GetOrigin()) + D.dot((np.array(factors) - 1) / 2.0 * spacing)
+    levelVTI = vtk.vtkImageData()
+    levelVTI.SetDimensions(newDims)
+    levelVTI.SetSpacing(spacing * np.array(factors))
+    levelVTI.SetOrigin(origin)
+    levelVTI.SetDirectionMatrix(directionMatrix)
+    newArray = numpy_support.numpy_to_vtk(A.reshape(-1, nComp) if nComp > 1 else A.ravel(), deep=1)
+    newArray.SetName(arrayName)
+    levelVTI.GetPointData().SetScalars(newArray)
+    return levelVTI
+
+
+class ImagePyramidCache:
+    """
+    Background built pyramid levels {time: {factor: vtkImageData}} with an LRU cap in bytes.
+    Only images with at least minVoxels are pyramided.
+    clear() starts a new generation - builds still running from before are discarded.
+    """
+    def __init__(self, factors=PYRAMID_FACTORS, maxBytes=PYRAMID_CACHE_BYTES, minVoxels=PYRAMID_MIN_VOXELS):
+        self.factors = sorted(factors)
+        self.maxBytes = maxBytes
+        self.minVoxels = minVoxels
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._generation = 0 # Bumped by clear (new dataset)
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tuiPyramid')
+
+    def request(self, time, vtiObj, arrayName=None):
+        """Queue building of all levels for vtiObj at time (no-op if small, built or queued)"""
+        if getNVoxels(vtiObj) < self.minVoxels:
+            return
+        if arrayName is None:
+            arrayName = vtkfilters.getScalarsArrayName(vtiObj)
+        key = (time, arrayName)
+        with self._lock:
+            if (key in self._cache) or (key in self._pending):
+                return
+            self._pending[key] = self._executor.submit(self._build, key, vtiObj, self._generation)
+
+    def _build(self, key, vtiObj, generation):
+        try:
+            levels = {}
+            for iFactor in self.factors:
+                levels[iFactor] = buildPyramidLevel(vtiObj, iFactor, key[1])
+            with self._lock:
+                if generation != self._generation:
+                    logger.debug("Discarded image pyramid for time %s from previous data", key[0])
+                    return
+                self._cache[key] = levels
+                self._evict()
+            logger.debug("Built image pyramid for time %s (%s)", key[0], key[1])
+        except Exception as e:
+            logger.error("Error building image pyramid: %s", e)
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._pending.pop(key, None)
+
+    def _evict(self):
+        while (len(self._cache) > 1) and (self.nBytes > self.maxBytes):
+            self._cache.popitem(last=False)
+
+    @property
+    def nBytes(self):
+        with self._lock:
+            return sum([int(iVTI.GetActualMemorySize()) * 1024 for iLevels in self._cache.values()
+                                                                 for iVTI in iLevels.values()])
+
+    def getInteractionLevel(self, time, arrayName, targetVoxels=PYRAMID_INTERACTION_VOXELS):
+        """Finest built level at time with no more than targetVoxels (else coarsest) - None if not built"""
+        with self._lock:
+            levels = self._cache.get((time, arrayName), None)
+            if levels is None:
+                return None
+            self._cache.move_to_end((time, arrayName))
+        for iFactor in self.factors:
+            if getNVoxels(levels[iFactor]) <= targetVoxels:
+                return levels[iFactor]
+        return levels[self.factors[-1]]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            for iFuture in self._pending.values():
+                iFuture.cancel()
+            self._pending = {}
+            self._cache.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Cursor readout: voxel under the mouse and throttled status bar messages.
+
+The voxel is computed directly from the image origin, spacing and direction
+(same rounding as vtkImageData.FindPoint) - no picking or point search. Status
+messages are shown at most once per display frame; the latest message is always
+shown once the mouse stops.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import time
+from tui import tuiCoordinates
+
+STATUS_MIN_INTERVAL_MS = 16 # ~ display rate
+
+
+def voxelAtX(vtiObj, X):
+    """(ijk, pointID) of voxel nearest to X (image coordinates) - None if outside image
+    Matches vtkImageData.FindPoint: ijk = floor((X - origin) / spacing + 0.5) (in image axes)"""
+    ijk = tuiCoordinates.imageXToIJK(vtiObj, X)
+    ptID = int(tuiCoordinates.ijkToPointID(vtiObj.GetDimensions(), ijk))
+    if ptID < 0:
+        return None
+    return ijk, ptID
+
+
+class ThrottledStatus:
+    """
+    Show messages via showFunc no more often than minIntervalMS.
+    A message arriving too soon is held and shown by a single shot timer (only the latest is kept).
+    """
+    def __init__(self, showFunc, minIntervalMS=STATUS_MIN_INTERVAL_MS):
+        self.showFunc = showFunc
+        self.minIntervalMS = minIntervalMS
+        self.nShown = 0
+        self.nDropped = 0
+        self._lastShown = None
+        self._lastTime = -1.0e9
+        self._held = None
+
+    def show(self, message):
+        if (message == self._lastShown) and (self._held is None): # Else held message is stale - replace it
+            return
+        elapsedMS = (time.perf_counter() - self._lastTime) * 1000.0
+        if elapsedMS >= self.minIntervalMS:
+            self._show(message)
+            return
+        if self._held is not None:
+            self.nDropped += 1
+        else:
+            from PyQt5.QtCore import QTimer
+            QTimer.singleShot(int(self.minIntervalMS - elapsedMS) + 1, self._showHeld)
+        self._held = message
+
+    def _showHeld(self):
+        if self._held is not None:
+            self._show(self._held)
+
+    def _show(self, message):
+        self._held = None
+        self._lastShown = message
+        self._lastTime = time.perf_counter()
+        self.nShown += 1
+        self.showFunc(message)
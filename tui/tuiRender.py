@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Coalesced rendering.
+
+A single user action often asks for several renders (window level, markups,
+crosshairs, camera resets ...). RenderScheduler.requestRender only marks the window
+dirty; the render happens once when control returns to the Qt event loop.
+renderNow is for callers that need the rendered result immediately (screenshots,
+reading reslice widget output).
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    """
+    Render a vtkRenderWindow at most once per Qt event loop pass.
+
+    nRequests - render requests received
+    nRenders  - renders performed
+    nSaved    - requests served by another request's render
+    """
+    def __init__(self, renderWindow):
+        self.renderWindow = renderWindow
+        self.nRequests = 0
+        self.nRenders = 0
+        self.nSaved = 0
+        self._nPending = 0
+        self._scheduled = False
+        self._cancelled = False
+
+    def requestRender(self):
+        """Mark window dirty - rendered once on the next event loop pass"""
+        if self._cancelled:
+            return
+        self.nRequests += 1
+        self._nPending += 1
+        if self._scheduled:
+            return
+        from PyQt5.QtCore import QTimer
+        self._scheduled = True
+        QTimer.singleShot(0, self._flush)
+
+    def _flush(self):
+        self._scheduled = False
+        if (self._nPending > 0) and (not self._cancelled):
+            self.nSaved += self._nPending - 1
+            self._render()
+
+    def renderNow(self):
+        """Render immediately - also serves any pending requests"""
+        if self._cancelled:
+            return
+        self.nSaved += self._nPending
+        self._render()
+
+    def _render(self):
+        self._nPending = 0
+        self.nRenders += 1
+        self.renderWindow.Render()
+
+    @property
+    def isPending(self):
+        return self._nPending > 0
+
+    def cancel(self):
+        """Drop pending requests and ignore any further (window closing)"""
+        self._cancelled = True
+        self._nPending = 0
+        logger.debug("Render scheduler: %d requests, %d renders, %d saved", self.nRequests, self.nRenders, self.nSaved)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Lazy 2D slice storage for the PIWAKAWAKA viewer.
+
+LazyResliceDict replaces the eagerly built {time: [vtkImageReslice, ...]} dictionary.
+It keeps the same access (resliceDict[time][sliceID]) but a reslice is only built
+and computed when asked for. Computed slices are held in an LRU cache limited by
+the size of their outputs in bytes. Cached slices hold a copy of the 2D output only
+(ResliceCopy), never the vtkImageReslice and so never its input volume.
+
+Axis aligned slices (AXIAL / CORONAL / SAGITTAL) skip vtkImageReslice: the slice is
+copied straight out of the volume array (see axisAlignedSlice) with the same
+geometry as the tuiUtils.defineReslice output.
+
+CineTextureCache holds window levelled RGBA textures of the current slice for every
+timestep so that cine playback only swaps textures.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+import numpy as np
+import vtk
+from vtk.util import numpy_support # type: ignore
+from ngawari import vtkfilters
+from tui import tuiUtils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLICE_CACHE_BYTES = 256 * 1024**2
+GRID_TOLERANCE = 1e-4 # Fraction of a voxel a slice plane may be off the grid and still use the fast path
+
+
+# ==========================================================
+#   AXIS ALIGNED FAST PATH
+# ==========================================================
+class StaticSlice:
+    """
+    Stand in for an updated vtkImageReslice holding only its 2D output and reslice axes.
+    Provides the parts of the vtkImageReslice interface used by the viewer and markups:
+    GetOutput, GetResliceAxes, GetOutputPort
+    """
+    def __init__(self, output, resliceAxes):
+        self.output = output
+        self.resliceAxes = resliceAxes
+        self._producer = None
+
+    def GetOutput(self):
+        return self.output
+
+    def GetResliceAxes(self):
+        return self.resliceAxes
+
+    def GetOutputPort(self):
+        if self._producer is None:
+            self._producer = vtk.vtkTrivialProducer()
+            self._producer.SetOutput(self.output)
+        return self._producer.GetOutputPort()
+
+    def Update(self):
+        pass
+
+
+class AxisAlignedSlice(StaticSlice):
+    """Axis aligned slice copied straight from the volume array (exact voxel plane)"""
+
+
+class ResliceCopy(StaticSlice):
+    """Copy of the output of a vtkImageReslice - no reference to the reslice input volume"""
+    @classmethod
+    def fromReslice(cls, reslice):
+        output = vtk.vtkImageData()
+        output.DeepCopy(reslice.GetOutput())
+        resliceAxes = vtk.vtkMatrix4x4()
+        resliceAxes.DeepCopy(reslice.GetResliceAxes())
+        return cls(output, resliceAxes)
+
+
+def _getAxisAndSign(vec):
+    """(axis, sign) if vec is +/- a coordinate axis, else (None, None)"""
+    vec = np.asarray(vec, dtype=float)
+    axis = int(np.argmax(np.abs(vec)))
+    if (abs(abs(vec[axis]) - 1.0) > 1e-9) or (np.sum(np.abs(vec)) - abs(vec[axis]) > 1e-9):
+        return None, None
+    return axis, int(np.sign(vec[axis]))
+
+
+def axisAlignedSlice(vtiObj, center, normal):
+    """Slice of active scalars of vtiObj through center with axis aligned normal, without vtkImageReslice.
+    Output geometry and reslice axes match tuiUtils.defineReslice (axes from tuiUtils.getResliceAxes).
+    Unlike defineReslice (2 slice max slab) this is exactly the voxel plane at center.
+    Returns AxisAlignedSlice or None if not possible (oblique, image direction set, plane off voxel grid)"""
+    directionMatrix = vtiObj.GetDirectionMatrix()
+    if (directionMatrix is not None) and (not directionMatrix.IsIdentity()):
+        return None
+    normal = np.asarray(normal, dtype=float)
+    u, v = tuiUtils.getResliceAxes(normal)
+    (aU, sU), (aV, sV), (aN, _) = _getAxisAndSign(u), _getAxisAndSign(v), _getAxisAndSign(normal)
+    if None in (aU, aV, aN):
+        return None
+    dims, spacing, origin = [0,0,0], np.array(vtiObj.GetSpacing()), np.array(vtiObj.GetOrigin())
+    vtiObj.GetDimensions(dims)
+    kN = (center[aN] - origin[aN]) / spacing[aN]
+    if (abs(kN - round(kN)) > GRID_TOLERANCE) or (round(kN) < 0) or (round(kN) > dims[aN] - 1):
+        return None
+    kN = int(round(kN))
+    scalars = vtiObj.GetPointData().GetScalars()
+    nComp = scalars.GetNumberOfComponents()
+    A = numpy_support.vtk_to_numpy(scalars).reshape(dims[2], dims[1], dims[0], nComp)
+    # Index along each image axis (numpy order z,y,x) - reversed where reslice axis points along -ve
+    index = [None, None, None]
+    index[aN] = kN
+    index[aU] = slice(None, None, sU)
+    index[aV] = slice(None, None, sV)
+    B = A[index[2], index[1], index[0]] # 2D + components: remaining axes in z,y,x order
+    remainingAxes = [iAxis for iAxis in (2, 1, 0) if iAxis != aN]
+    if remainingAxes.index(aV) != 0: # want rows along v, columns along u
+        B = np.swapaxes(B, 0, 1)
+    B = np.ascontiguousarray(B).reshape(-1, nComp)
+    # Geometry (in reslice coordinates) as vtkImageReslice: origin at min of input bounds
+    bounds = vtiObj.GetBounds()
+    outOrigin = [min(sA * (bounds[2*aA] - center[aA]), sA * (bounds[2*aA+1] - center[aA])) for aA, sA in ((aU, sU), (aV, sV))]
+    output = vtk.vtkImageData()
+    output.SetDimensions(dims[aU], dims[aV], 1)
+    output.SetSpacing(spacing[aU], spacing[aV], spacing[aN])
+    output.SetOrigin(outOrigin[0], outOrigin[1], 0.0)
+    newArray = numpy_support.numpy_to_vtk(B if nComp > 1 else B.ravel(), deep=1)
+    newArray.SetName('ImageScalars')
+    output.GetPointData().SetScalars(newArray)
+    output.GetFieldData().ShallowCopy(vtiObj.GetFieldData())
+    resliceAxes = vtk.vtkMatrix4x4()
+    for i in range(3):
+        resliceAxes.SetElement(i, 0, u[i])
+        resliceAxes.SetElement(i, 1, v[i])
+        resliceAxes.SetElement(i, 2, normal[i])
+        resliceAxes.SetElement(i, 3, center[i])
+    return AxisAlignedSlice(output, resliceAxes)
+
+
+# ==========================================================
+#   LAZY RESLICE DICTIONARY
+# ==========================================================
+
+
+class LazyResliceDict(Mapping):
+    """
+    Read-only mapping {time: sequence of reslices (one per slice)} built on access.
+
+    vtiDict      - {time: vtkImageData} (may be a tuiFrameStore.LazyFrameDict)
+    sliceCenters - list of slice center points
+    sliceNormals - list of slice normals
+    orientation  - passed to resliceFunc (AXIAL, CORONAL, SAGITTAL or None for custom)
+    maxBytes     - size of LRU cache of computed slice outputs. The most recently
+                    used slice is always kept. Slices hold a copy of their output only
+                    (StaticSlice) so the cache does not keep input timesteps alive
+    resliceFunc  - callable (vtiObj, orientation, center, normal) -> updated vtkImageReslice
+                    (default tuiUtils.defineReslice)
+    AXIS_ALIGNED_FAST - use axisAlignedSlice where possible (default resliceFunc only)
+    interpolation - interpolation of new reslices (default resliceFunc only), see refine
+    """
+    def __init__(self, vtiDict, times, sliceCenters, sliceNormals, orientation=None,
+                 maxBytes=DEFAULT_SLICE_CACHE_BYTES, resliceFunc=None, AXIS_ALIGNED_FAST=True,
+                 interpolation=tuiUtils.INTERP_NEAREST):
+        self.vtiDict = vtiDict
+        self.times = list(times)
+        self.sliceCenters = sliceCenters
+        self.sliceNormals = sliceNormals
+        self.orientation = orientation
+        self.maxBytes = maxBytes
+        self.AXIS_ALIGNED_FAST = AXIS_ALIGNED_FAST
+        self.interpolation = interpolation
+        self.CUSTOM_RESLICE = resliceFunc is not None
+        self.resliceFunc = resliceFunc if resliceFunc is not None else self._defineReslice
+        self._cache = OrderedDict()
+        self._nBytes = {}
+        self._lock = threading.RLock()
+
+    def _defineReslice(self, vtiObj, orientation, center, normal):
+        if self.AXIS_ALIGNED_FAST:
+            vtkfilters.ensureScalarsSet(vtiObj, possibleName='MRA')
+            fastSlice = axisAlignedSlice(vtiObj, center, normal)
+            if fastSlice is not None:
+                return fastSlice
+        return tuiUtils.defineReslice(vtiObj, orientation, center, normalVector=normal,
+                                      interpolation=self.interpolation)
+
+    # Mapping interface
+    def __getitem__(self, time):
+        if time not in self.times:
+            raise KeyError(time)
+        return _TimeSlices(self, time)
+
+    def __iter__(self):
+        return iter(self.times)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __contains__(self, time):
+        return time in self.times
+
+    @property
+    def nSlices(self):
+        return len(self.sliceCenters)
+
+    def getReslice(self, time, sliceID):
+        """Computed slice (StaticSlice - vtkImageReslice interface) of slice sliceID at time (built on first request)"""
+        key = (time, sliceID)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        reslice = self.resliceFunc(self.vtiDict[time], self.orientation,
+                                   self.sliceCenters[sliceID], self.sliceNormals[sliceID])
+        if isinstance(reslice, vtk.vtkImageReslice):
+            reslice = ResliceCopy.fromReslice(reslice) # Release the input volume
+        with self._lock:
+            self._cache[key] = reslice
+            self._nBytes[key] = int(reslice.GetOutput().GetActualMemorySize()) * 1024
+            self._evict()
+        return reslice
+
+    def _evict(self):
+        while (len(self._cache) > 1) and (sum(self._nBytes.values()) > self.maxBytes):
+            key, _ = self._cache.popitem(last=False)
+            self._nBytes.pop(key, None)
+
+    def _newReslice(self, time, sliceID, interpolation):
+        """Updated vtkImageReslice of slice sliceID at time with interpolation (not cached)"""
+        vtiObj, center, normal = self.vtiDict[time], self.sliceCenters[sliceID], self.sliceNormals[sliceID]
+        if not self.CUSTOM_RESLICE:
+            return tuiUtils.defineReslice(vtiObj, self.orientation, center, normalVector=normal,
+                                          interpolation=interpolation)
+        reslice = self.resliceFunc(vtiObj, self.orientation, center, normal)
+        tuiUtils.setResliceInterpolation(reslice, interpolation)
+        reslice.Update()
+        return reslice
+
+    def refine(self, time, sliceID, interpolation):
+        """Recompute slice in place (same output object) with interpolation, e.g. once interaction stops
+        A temporary vtkImageReslice is built and dropped once its output is copied.
+        Axis aligned fast path slices are exact voxel planes and are returned unchanged"""
+        staticSlice = self.getReslice(time, sliceID)
+        if not isinstance(staticSlice, ResliceCopy):
+            return staticSlice
+        reslice = self._newReslice(time, sliceID, interpolation)
+        staticSlice.GetOutput().DeepCopy(reslice.GetOutput())
+        with self._lock:
+            if (time, sliceID) in self._cache:
+                self._nBytes[(time, sliceID)] = int(staticSlice.GetOutput().GetActualMemorySize()) * 1024
+        return staticSlice
+
+    def isComputed(self, time, sliceID):
+        with self._lock:
+            return (time, sliceID) in self._cache
+
+    def addTimes(self, newTimes):
+        """Make new timesteps available (e.g. progressive loading) - nothing is computed"""
+        for iTime in newTimes:
+            if iTime not in self.times:
+                self.times.append(iTime)
+
+    def clear(self):
+        """Drop all computed slices"""
+        with self._lock:
+            self._cache.clear()
+            self._nBytes.clear()
+
+
+class _TimeSlices(Sequence):
+    """Slices of one timestep of a LazyResliceDict: behaves like the old list of reslices"""
+    def __init__(self, resliceDict, time):
+        self.resliceDict = resliceDict
+        self.time = time
+
+    def __getitem__(self, sliceID):
+        if isinstance(sliceID, slice):
+            return [self[i] for i in range(*sliceID.indices(len(self)))]
+        if sliceID < 0:
+            sliceID += len(self)
+        if (sliceID < 0) or (sliceID >= len(self)):
+            raise IndexError(sliceID)
+        return self.resliceDict.getReslice(self.time, sliceID)
+
+    def __len__(self):
+        return self.resliceDict.nSlices
+
+
+# ==========================================================
+#   CINE TEXTURES
+# ==========================================================
+DEFAULT_CINE_CACHE_BYTES = 256 * 1024**2
+
+
+def sliceToRGBA(sliceVTI, window, level):
+    """Window levelled RGBA (uint8, grey) vtkImageData of a single component 2D slice - same geometry
+    None if slice has more than one component (shown in colour by the image actor)"""
+    scalars = sliceVTI.GetPointData().GetScalars()
+    if (scalars is None) or (scalars.GetNumberOfComponents() != 1):
+        return None
+    grey = tuiUtils.windowLevelToUint8(numpy_support.vtk_to_numpy(scalars), window, level)
+    rgba = np.empty((grey.size, 4), dtype=np.uint8)
+    rgba[:, :3] = grey[:, np.newaxis]
+    rgba[:, 3] = 255
+    textureVTI = vtk.vtkImageData()
+    textureVTI.CopyStructure(sliceVTI)
+    newArray = numpy_support.numpy_to_vtk(rgba, deep=1)
+    newArray.SetName('RGBA')
+    textureVTI.GetPointData().SetScalars(newArray)
+    return textureVTI
+
+
+class CineTextureCache:
+    """
+    Window levelled RGBA textures of one slice over time {time: vtkImageData} for cine playback.
+
+    Textures are valid for a signature (sliceID, arrayName, window, level): a lookup with a
+    different signature drops all textures. Once maxBytes is reached further timesteps are
+    not cached (an LRU would evict every frame of a looping cine).
+    """
+    def __init__(self, maxBytes=DEFAULT_CINE_CACHE_BYTES):
+        self.maxBytes = maxBytes
+        self.signature = None
+        self._textures = {}
+        self.nBytes = 0
+
+    def getTexture(self, resliceDict, time, sliceID, arrayName, window, level, BUILD=True):
+        """Texture of slice sliceID at time - built from resliceDict if BUILD and room in cache
+        Returns None if not available (caller shows the slice as normal)"""
+        signature = (sliceID, arrayName, float(window), float(level))
+        if signature != self.signature:
+            self.clear()
+            self.signature = signature
+        textureVTI = self._textures.get(time, None)
+        if (textureVTI is not None) or (not BUILD) or (self.nBytes >= self.maxBytes):
+            return textureVTI
+        textureVTI = sliceToRGBA(resliceDict[time][sliceID].GetOutput(), window, level)
+        if textureVTI is not None:
+            self._textures[time] = textureVTI
+            self.nBytes += int(textureVTI.GetActualMemorySize()) * 1024
+        return textureVTI
+
+    def fill(self, resliceDict, times, sliceID, arrayName, window, level):
+        """Build textures for all times (until cache full) - returns number cached"""
+        for iTime in times:
+            if self.getTexture(resliceDict, iTime, sliceID, arrayName, window, level) is None:
+                break
+        return len(self._textures)
+
+    def __len__(self):
+        return len(self._textures)
+
+    def clear(self):
+        self.signature = None
+        self._textures = {}
+        self.nBytes = 0
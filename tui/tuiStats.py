@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Created on 18 October 2026
+
+Cached statistics of image arrays (range, histogram / percentiles, sampled means).
+
+Statistics are held per (arrayName, time) and recomputed only if the underlying
+vtkDataArray is replaced or modified (MTime). Histograms and means are estimated
+from a subsample (no full size temporaries) so they are cheap on very large volumes.
+
+@author: Fraser M. Callaghan
+@email: callaghan.fm@gmail.com
+"""
+
+import logging
+import threading
+import numpy as np
+from vtk.util import numpy_support # type: ignore
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_MAX_SAMPLES = 2**22 # Values used to build a histogram (strided subsample above this)
+HISTOGRAM_N_BINS = 4096 # Bins for float (or wide integer) data - narrow integer data uses one bin per value
+MEAN_MAX_SAMPLES = 2**20 # Random voxels used to estimate a mean (standard error ~ std / 1000)
+
+
+def getSample(A, maxSamples=HISTOGRAM_MAX_SAMPLES):
+    """Strided view of A (flattened) with no more than ~maxSamples values - no copy of A"""
+    A = A.reshape(-1)
+    if (maxSamples is None) or (A.size <= maxSamples):
+        return A
+    return A[::int(np.ceil(A.size / maxSamples))]
+
+
+def getRandomSample(A, maxSamples=MEAN_MAX_SAMPLES, seed=0):
+    """Random (with replacement, reproducible) sample of A (flattened) of maxSamples values
+    All of A (as a view) if A is smaller"""
+    A = A.reshape(-1)
+    if (maxSamples is None) or (A.size <= maxSamples):
+        return A
+    idx = np.random.default_rng(seed).integers(0, A.size, maxSamples)
+    idx.sort() # Memory order - kinder to memory mapped data
+    return A[idx]
+
+
+def sampleMeanAbove(A, threshold):
+    """(mean, standard error, nValues) of finite values of A above threshold - None if there are none"""
+    A = A[A > threshold] # NaN compare False
+    if A.size == 0:
+        return None
+    A = A.astype(np.float64)
+    return float(A.mean()), float(A.std() / np.sqrt(A.size)), int(A.size)
+
+
+def buildHistogram(A, nBins=HISTOGRAM_N_BINS):
+    """Histogram (counts, edges) of finite values of A - None if A has no finite values"""
+    if A.dtype.kind == 'f':
+        A = A[np.isfinite(A)]
+    if A.size == 0:
+        return None
+    aMin, aMax = A.min(), A.max()
+    if (A.dtype.kind in 'iub') and (int(aMax) - int(aMin) < 16 * nBins):
+        counts = np.bincount((A.astype(np.int64) - int(aMin)))
+        edges = np.arange(len(counts) + 1) + (int(aMin) - 0.5)
+        return counts, edges
+    if aMax == aMin:
+        return np.array([A.size]), np.array([aMin - 0.5, aMax + 0.5])
+    return np.histogram(A, bins=nBins, range=(float(aMin), float(aMax)))
+
+
+def percentilesFromHistogram(counts, edges, percentiles):
+    """Percentiles (0-100) from histogram, linear within a bin"""
+    cdf = np.cumsum(counts)
+    values = []
+    for iPercentile in percentiles:
+        target = iPercentile / 100.0 * cdf[-1]
+        idx = min(int(np.searchsorted(cdf, target, side='left')), len(counts) - 1)
+        previous = cdf[idx - 1] if idx > 0 else 0
+        frac = (target - previous) / max(counts[idx], 1)
+        values.append(float(edges[idx] + min(max(frac, 0.0), 1.0) * (edges[idx + 1] - edges[idx])))
+    return values
+
+
+class ArrayStatsCache:
+    """
+    Statistics of point data arrays of vtkImageData keyed on (arrayName, time).
+
+    An entry is dropped and recomputed when the vtkDataArray MTime changes (array modified or replaced).
+    Values are computed lazily on first request.
+    """
+    def __init__(self, maxSamples=HISTOGRAM_MAX_SAMPLES, nBins=HISTOGRAM_N_BINS):
+        self.maxSamples = maxSamples
+        self.nBins = nBins
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def _getEntry(self, vtiObj, time, arrayName):
+        vtkArray = vtiObj.GetPointData().GetArray(arrayName)
+        if vtkArray is None:
+            raise KeyError(arrayName)
+        stamp = vtkArray.GetMTime() # Global counter - also differs if array replaced
+        with self._lock:
+            entry = self._entries.get((arrayName, time), None)
+            if (entry is None) or (entry['stamp'] != stamp):
+                entry = {'stamp': stamp}
+                self._entries[(arrayName, time)] = entry
+        return entry, vtkArray
+
+    def getRange(self, vtiObj, time, arrayName):
+        """[min, max] of arrayName (component 0, as vtkDataArray.GetRange())"""
+        entry, vtkArray = self._getEntry(vtiObj, time, arrayName)
+        if 'range' not in entry:
+            entry['range'] = list(vtkArray.GetRange())
+        return entry['range']
+
+    def getHistogram(self, vtiObj, time, arrayName):
+        """(counts, edges) of all components of arrayName from a subsample - None if no finite values"""
+        entry, vtkArray = self._getEntry(vtiObj, time, arrayName)
+        if 'histogram' not in entry:
+            A = getSample(numpy_support.vtk_to_numpy(vtkArray), self.maxSamples)
+            entry['histogram'] = buildHistogram(A, self.nBins)
+        return entry['histogram']
+
+    def getPercentiles(self, vtiObj, time, arrayName, percentiles):
+        """Approximate percentiles (0-100) of arrayName from cached histogram - None if no finite values"""
+        histogram = self.getHistogram(vtiObj, time, arrayName)
+        if histogram is None:
+            return None
+        return percentilesFromHistogram(histogram[0], histogram[1], percentiles)
+
+    def getMeanAbove(self, vtiObj, time, arrayName, threshold):
+        """Estimated mean of values of arrayName above threshold from a random sample
+        Returns (mean, standard error, nSampledValuesAbove) or None if no values above threshold"""
+        entry, vtkArray = self._getEntry(vtiObj, time, arrayName)
+        key = ('meanAbove', threshold)
+        if key not in entry:
+            A = getRandomSample(numpy_support.vtk_to_numpy(vtkArray), MEAN_MAX_SAMPLES)
+            entry[key] = sampleMeanAbove(A, threshold)
+        return entry[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
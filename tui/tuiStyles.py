@@ -38,6 +38,7 @@ class ImageInteractor(vtk.vtkInteractorStyleTrackballCamera):
         self.capturedPts = [[]]
         self.SHOWING_MARKUP = False
         self.pixelPick = 0
+        self.priorityView = None # (view, widgets) - view whose reslice cursor widget has priority, for these widgets
         #
         self.userDefinedKeyCallbacks = {}
         self.AddObserver("KeyPressEvent", self.keyPressCallback)
@@ -58,11 +59,11 @@ class ImageInteractor(vtk.vtkInteractorStyleTrackballCamera):
         self.userDefinedKeyCallbacks = keyCallbackDict
 
 
-    def getXAtMouse(self):
+    def getXAtMouse(self, PICK=True):
         (mouseX, mouseY) = self.GetInteractor().GetEventPosition()
         activeRenderer = self.GetInteractor().FindPokedRenderer(mouseX, mouseY)
         self.parentImageViewer.interactionView = self.parentImageViewer.rendererArray.index(activeRenderer)
-        X = self.parentImageViewer.mouseXYTo_ImageCS_X(mouseX, mouseY)
+        X = self.parentImageViewer.mouseXYTo_ImageCS_X(mouseX, mouseY, PICK=PICK)
         return X
 
     ## ========== DEFAULT ===================================================================
@@ -83,28 +84,32 @@ class ImageInteractor(vtk.vtkInteractorStyleTrackballCamera):
 
     def mMoveCallback(self, obj, event):
         try:
-            X = self.getXAtMouse()
+            X = self.getXAtMouse(PICK=False)
             ## - Depending on view that mouse over - enable / disable the different widgets (THIS IS NEEDED)
-            for i in range(3):
-                if i == self.parentImageViewer.interactionView:
-                    self.parentImageViewer.resliceCursorWidgetArray[i].SetPriority(1.0)
-                else:
-                    self.parentImageViewer.resliceCursorWidgetArray[i].SetPriority(-1.0)
+            # Widgets are recreated on new data - so cache is keyed on them too
+            priorityView = (self.parentImageViewer.interactionView, tuple(self.parentImageViewer.resliceCursorWidgetArray[:3]))
+            if priorityView != self.priorityView:
+                for i in range(3):
+                    if i == self.parentImageViewer.interactionView:
+                        self.parentImageViewer.resliceCursorWidgetArray[i].SetPriority(1.0)
+                    else:
+                        self.parentImageViewer.resliceCursorWidgetArray[i].SetPriority(-1.0)
+                self.priorityView = priorityView
             #
             if self.parentImageViewer.interactionView < 4:
-                try:
-                    ptID = self.parentImageViewer.getPointIDAtX(X)
-                    ijk = self.parentImageViewer.getIJKAtPtID(ptID)
+                voxel = self.parentImageViewer.getVoxelAtX(X) if X is not None else None
+                if voxel is not None:
+                    ijk, ptID = voxel
                     pixelVal = self.parentImageViewer.getPixelValueAtPtID_tuple(ptID)
                     if len(pixelVal) > 1:
                         pixelVal = tuiUtils.np.linalg.norm(pixelVal)
                     else:
                         pixelVal = pixelVal[0]
-                    self.parentImageViewer.statusBar().showMessage('I: %d, J: %d, K: %d. X: %3.3f, %3.3f, %3.3f. Pixel: %d = %3.2f'%(
+                    self.parentImageViewer.statusReadout.show('I: %d, J: %d, K: %d. X: %3.3f, %3.3f, %3.3f. Pixel: %d = %3.2f'%(
                                                                     ijk[0], ijk[1], ijk[2],X[0], X[1], X[2],
                                                                     ptID, pixelVal))
-                except (ValueError, TypeError): # outside image
-                    self.parentImageViewer.statusBar().showMessage('I: %d, J: %d, K: %d. X: %3.3f, %3.3f, %3.3f. %s'%(
+                else: # outside image
+                    self.parentImageViewer.statusReadout.show('I: %d, J: %d, K: %d. X: %3.3f, %3.3f, %3.3f. %s'%(
                                                                     0,0,0,0,0,0,'Outside Image'))
             self.OnMouseMove()
         except Exception as e:
@@ -10,11 +10,11 @@ Some general utilities to support tui
 @email: callaghan.fm@gmail.com
 """
 
-from tui import tuimarkupui
-
 import numpy as np
 import vtk
+from vtk.util import numpy_support # type: ignore
 from ngawari import vtkfilters, ftk
+from tui import tuiCoordinates
 colors = vtk.vtkNamedColors()
 
 
@@ -38,11 +38,57 @@ CORONAL = 'CORONAL'
 SAGITTAL = 'SAGITTAL'
 CUSTOM = 'Custom'
 
+# Reslice interpolation: fast while interacting, better once still
+INTERP_NEAREST = 'Nearest'
+INTERP_LINEAR = 'Linear'
+INTERP_CUBIC = 'Cubic'
+
+# Data type policy on load: 'native' keeps the dtype as stored on disk
+DTYPE_NATIVE = 'native'
+DTYPE_FLOAT32 = 'float32'
+DTYPE_FLOAT64 = 'float64'
+DTYPE_POLICIES = {DTYPE_NATIVE: None,
+                  DTYPE_FLOAT32: np.float32,
+                  DTYPE_FLOAT64: np.float64}
+
+
+# ==========================================================
+#   DATA TYPE HELPERS
+# ==========================================================
+def applyDtypePolicy(vtiObj, dtypePolicy):
+    """Cast all point data arrays to the dtype of dtypePolicy (no-op for native or if already that dtype)
+    Returns (bytesNow, bytesAsFloat64)"""
+    dtype = DTYPE_POLICIES[dtypePolicy]
+    scalarsName = vtkfilters.getScalarsArrayName(vtiObj)
+    nBytes, nBytes64 = 0, 0
+    for iName in vtkfilters.getArrayNames(vtiObj):
+        iArray = vtiObj.GetPointData().GetArray(iName)
+        if iArray is None:
+            continue
+        if (dtype is not None) and (np.dtype(numpy_support.get_numpy_array_type(iArray.GetDataType())) != dtype):
+            vtkfilters.setArrayDtype(vtiObj, iName, dtype)
+            iArray = vtiObj.GetPointData().GetArray(iName)
+        nValues = iArray.GetNumberOfTuples() * iArray.GetNumberOfComponents()
+        nBytes += nValues * iArray.GetDataTypeSize()
+        nBytes64 += nValues * 8
+    if scalarsName:
+        vtiObj.GetPointData().SetActiveScalars(scalarsName)
+    return nBytes, nBytes64
+
+
+def windowLevelToUint8(A, window, level):
+    """Map array of any dtype to 0-255 (uint8) using window / level"""
+    lowP = level - (window / 2.0)
+    A = np.clip(np.asarray(A, dtype=np.float32), lowP, lowP + window)
+    A = (A - lowP) * (255.0 / max(float(window), np.finfo(np.float32).eps))
+    return A.astype(np.uint8)
+
 
 # ==========================================================
 #   DIALOG FUNCTIONS
 # ==========================================================
 def dialogGetName(parent, prompt='Enter feature name:'):
+    from tui import tuimarkupui
     text, ok = tuimarkupui.QtWidgets.QInputDialog.getText(parent, 'Input Dialog',
                                           prompt)
     if ok:
@@ -51,6 +97,7 @@ def dialogGetName(parent, prompt='Enter feature name:'):
 
 
 def dialogGetNumber(parent, infoStr='Enter value:', parse=float):
+    from tui import tuimarkupui
     text, ok = tuimarkupui.QtWidgets.QInputDialog.getText(parent, 'Input Dialog',
                                           infoStr)
     if ok:
@@ -69,6 +116,7 @@ def checkIfExtnPresent(fileName, extn): # TODO rename
 
 
 def getApp(appName):
+    from tui import tuimarkupui
     app = tuimarkupui.QtWidgets.QApplication([appName])
     return app
 
@@ -160,7 +208,7 @@ def renderVolume3D(vtiObj):
 #   IMAGE FUNCTIONS
 # ==========================================================
 def imageX_2_PointID(imageData, X):
-    ptID = imageData.FindPoint(X)
+    ptID = int(tuiCoordinates.imageXToPointID(imageData, X))
     if ptID < 0:
         raise ValueError('Point is outside of image (X=%s)'%(str(X)))
     return ptID
@@ -172,12 +220,7 @@ def imageX_2_IJK(imageData, X):
 
 
 def imageID_2_IJK(imageData, ID):
-    # ijk = [0, 0, 0]
-    # pcoords = [0.0, 0.0, 0.0]
-    # res = imageData.ComputeStructuredCoordinates(iX, ijk, pcoords)
-    # if res == 0:
-    #     return [0, 0, 0]
-    return np.unravel_index(ID, shape=imageData.GetDimensions(), order='F')
+    return tuple(tuiCoordinates.pointIDToIJK(imageData.GetDimensions(), ID))
 
 
 # ==========================================================
@@ -267,39 +310,54 @@ def _getOrientationMatrix(ORIENTATION, center):
 # ==========================================================
 #   RESLICE FUNCTIONS
 # ==========================================================
-def defineReslice(vtiObj, ORIENTATION, center, normalVector=None, guidingVector=None, slabNumberOfSlices=2):
+def getResliceAxes(normalVector, guidingVector=None):
+    """In plane axes (u, v) of a reslice with normal normalVector - as used by defineReslice"""
+    if guidingVector is None:
+        if (abs(normalVector[0]) >= abs(normalVector[1])):
+            factor = 1.0 / np.sqrt(normalVector[0] * normalVector[0] + normalVector[2] * normalVector[2])
+            u0 = -normalVector[2] * factor
+            u1 = 0.0
+            u2 = normalVector[0] * factor
+        else:
+            factor = 1.0 / np.sqrt(normalVector[1] * normalVector[1] + normalVector[2] * normalVector[2])
+            u0 = 0.0
+            u1 = normalVector[2] * factor
+            u2 = -normalVector[1] * factor
+        u = np.array([u0, u1, u2])
+    else:
+        u = ftk.getVectorComponentNormalToRefVec(guidingVector, normalVector)
+        if np.isnan(u[0]):
+            u = guidingVector
+        u = u / np.linalg.norm(u)
+    v = np.cross(normalVector, u)
+    return u, v
+
+
+def setResliceInterpolation(reslice, interpolation):
+    """Set interpolation of vtkImageReslice: INTERP_NEAREST, INTERP_LINEAR or INTERP_CUBIC"""
+    if interpolation == INTERP_LINEAR:
+        reslice.SetInterpolationModeToLinear()
+    elif interpolation == INTERP_CUBIC:
+        reslice.SetInterpolationModeToCubic()
+    else:
+        reslice.SetInterpolationModeToNearestNeighbor()
+
+
+def defineReslice(vtiObj, ORIENTATION, center, normalVector=None, guidingVector=None, slabNumberOfSlices=2,
+                  interpolation=INTERP_NEAREST):
     # Extract a slice in the desired orientation
     vtkfilters.ensureScalarsSet(vtiObj, possibleName='MRA')
     reslice = vtk.vtkImageReslice()
     reslice.SetInputData(vtiObj)
     reslice.SetOutputDimensionality(2)
     if normalVector is not None:
-        if guidingVector is None:
-            if (abs(normalVector[0]) >= abs(normalVector[1])):
-                factor = 1.0 / np.sqrt(normalVector[0] * normalVector[0] + normalVector[2] * normalVector[2])
-                u0 = -normalVector[2] * factor
-                u1 = 0.0
-                u2 = normalVector[0] * factor
-            else:
-                factor = 1.0 / np.sqrt(normalVector[1] * normalVector[1] + normalVector[2] * normalVector[2])
-                u0 = 0.0
-                u1 = normalVector[2] * factor
-                u2 = -normalVector[1] * factor
-            u = np.array([u0, u1, u2])
-        else:
-            u = ftk.getVectorComponentNormalToRefVec(guidingVector, normalVector)
-            if np.isnan(u[0]):
-                u = guidingVector
-            u = u / np.linalg.norm(u)
-        v = np.cross(normalVector, u)
+        u, v = getResliceAxes(normalVector, guidingVector)
         reslice.SetResliceAxesDirectionCosines(u, v, normalVector)
         reslice.SetResliceAxesOrigin(center)
     else:
         reslice.SetResliceAxes(_getOrientationMatrix(ORIENTATION, center))
 
-    # reslice.SetInterpolationModeToLinear()
-    reslice.SetInterpolationModeToNearestNeighbor()
-    # reslice.SetInterpolationModeToCubic()
+    setResliceInterpolation(reslice, interpolation)
     reslice.SetSlabNumberOfSlices(slabNumberOfSlices)
     reslice.SetSlabModeToMax()
     reslice.Update()
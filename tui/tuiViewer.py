@@ -17,7 +17,7 @@ import vtk
 import os
 import numpy as np
 from ngawari import vtkfilters
-from tui import tuiStyles, tuiUtils, tuimarkupui, baseMarkupViewer
+from tui import tuiStyles, tuiUtils, tuimarkupui, baseMarkupViewer, tuiPyramid, tuiExport, tuiReadout, tuiCoordinates, tuiMarkups
 
 logger = logging.getLogger(__name__)
 
@@ -67,20 +67,34 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         
         self.resliceCursorWidgetArray = [None] * 3  # [Bot R, Bot L, Top L]
         self.resliceCursor = vtk.vtkResliceCursor()
+        self.displayVTI = vtk.vtkImageData() # Bound to resliceCursor once: holds scalars of current timestep
 
         self.picker = vtk.vtkPointPicker()
         self.picker.SetTolerance(0.005)
         self.worldPicker = vtk.vtkWorldPointPicker()
+        self.cursorPlane = vtk.vtkPlane() # Reused by mouseXYTo_ImageCS_X
         #
         self.interactionState = None
         self.interactionView = None
+        self.imagePyramid = tuiPyramid.ImagePyramidCache() # Coarse levels used while dragging the reslice cursor
+        self.resliceImageIsCoarse = False
+        # Reslice quality policy: interactiveInterpolation while dragging / scrolling,
+        # stillInterpolation on EndInteraction or after interactionIdleMS without interaction
+        self.interactiveInterpolation = tuiUtils.INTERP_NEAREST
+        self.stillInterpolation = tuiUtils.INTERP_LINEAR
+        self.interactionIdleMS = 250
+        self.interactionIdleTimer = None
         #
         self.viewButtonList = [None] * 5
         self.connections()
+        self.statusReadout = tuiReadout.ThrottledStatus(self.statusBar().showMessage) # Mouse over voxel readout
         # Markups already initialized in base class
         self.threeDContourActor = None
         self.planeActors3 = []
         self.markupActorList = []
+        self.pointGlyphLayers = [tuiMarkups.PointGlyphLayer() for _ in range(4)] # Persistent point markups - one per renderer
+        for i in range(4):
+            self.rendererArray[i].AddActor(self.pointGlyphLayers[i].actor)
         self.renderer3D = None
         self.interactorStyleDict = {'Image': tuiStyles.ImageInteractor(self),
                                     'Trackball': vtk.vtkInteractorStyleTrackballCamera()}
@@ -135,7 +149,8 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             nn = np.array(self.getCurrentViewNormal())
             dx = self._getDeltaX()
             self.resliceCursor.SetCenter(cp + nn * dx)
-            self._updateMarkups() # will render
+            self.__beginInteractiveFrame(IDLE_TIMEOUT=True)
+            self._updateMarkups() # requests render
 
     def scrollBackwardCurrentSlice1(self):
         if self.interactionView < 3: # If in 3D window then do nothing
@@ -143,6 +158,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             nn = -1.0 * np.array(self.getCurrentViewNormal())
             dx = self._getDeltaX()
             self.resliceCursor.SetCenter(cp + nn * dx)
+            self.__beginInteractiveFrame(IDLE_TIMEOUT=True)
             self._updateMarkups()
 
     # BUTTONS
@@ -153,7 +169,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             for i in range(3):
                 if i != viewID:
                     self.rendererArray[i].GetActiveCamera().SetParallelScale(ps)
-            self.renderWindow.Render()
+            self.requestRender()
 
     def cameraReset(self):
         viewUp = [[0, 0, 1], [0, 0, 1], [0, -1, 0]]
@@ -169,11 +185,11 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             self.rendererArray[i].ResetCamera()
         # Set reference scale for zoom calculation (use first renderer as reference)
         self._referenceParallelScale = self.rendererArray[0].GetActiveCamera().GetParallelScale()
-        self.renderWindow.Render()
+        self.requestRender()
 
     def cameraReset3D(self):
         self.rendererArray[3].ResetCameraClippingRange()
-        self.renderWindow.Render()
+        self.requestRender()
 
     def getZoomFactor(self):
         """Get current zoom factor from camera for 3D viewer"""
@@ -199,7 +215,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             self.__updateCrosshairs(True)
         else:
             self.__updateCrosshairs(False)
-        self.renderWindow.Render()
+        self.requestRender()
 
     def _getHelpFileName(self):
         """Override to specify TUI-specific help file"""
@@ -227,7 +243,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             resA = self.resliceCursorWidgetArray[i].GetRepresentation().SetWindowLevel(w, l)
         for i in range(1,3):
             resB = self.resliceCursorWidgetArray[i].GetRepresentation().SetLookupTable(self.resliceCursorWidgetArray[0].GetRepresentation().GetLookupTable())
-        self.renderWindow.Render()
+        self.requestRender()
         new_w, new_l = self.getWindowLevel()
         logger.debug("SetWindowLevel: New window level: window=%.2f, level=%.2f", new_w, new_l)
         logger.debug("SetWindowLevel: resA=%s, resB=%s", resA, resB)
@@ -248,7 +264,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         else:
             self.__grossView(viewID)
         self.__resetViewsButtons(viewID)
-        self.renderWindow.Render()
+        self.requestRender()
     def __grossView(self, viewID):
         dy, cy = [0, 0.33, 0.66, 1], 0
         dx = 0.8 # % of renderwindow that large view will occupy
@@ -263,7 +279,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         self.rendererArray[1].SetViewport(0.5, 0, 1, 0.5)
         self.rendererArray[2].SetViewport(0, 0.5, 0.5, 1)
         self.rendererArray[3].SetViewport(0.5, 0.5, 1, 1)
-        self.renderWindow.Render()
+        self.requestRender()
     def __axialButtonAction(self):
         if self.axialButton.isChecked():
             self.setGrossFrame(2)
@@ -381,14 +397,16 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
     def _setupViewerSpecificData(self):
         """3D-specific setup after data load"""
         self.__setupNewImageData() ## MAIN SETUP HERE ##
-        ii = list(self.vtiDict.values())[0]
+        ii = self.vtiDict[self.times[0]]
         dims = [0,0,0]
         ii.GetDimensions(dims)
         self.currentSliceID = int(dims[2]/2.0)
         self.setGrossFrame(4) # Make grid view default
 
 
-    # Exit method inherited from base class
+    def exit(self):
+        self.imagePyramid.shutdown()
+        return baseMarkupViewer.BaseMarkupViewer.exit(self)
 
     # ==================================================================================================================
     # RESCLIE CURSOR WIDGET CALLBACKS
@@ -397,6 +415,8 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         self.interactionState = thisLineRepresentation.GetInteractionState()
         if self.interactionView == 3:
             self.interactionState = 3  # Force 3D view state
+        else:
+            self.__beginInteractiveFrame()
     
 
     def ResliceCursorCallback(self, obj, event):
@@ -416,6 +436,72 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
 
     def ResliceCursorEndCallback(self, obj, event):
         self.interactionState = 0
+        self.__endInteractiveFrame()
+
+    def __beginInteractiveFrame(self, IDLE_TIMEOUT=False):
+        """Fast reslicing while interacting: interactiveInterpolation and coarse pyramid level (if built)
+        IDLE_TIMEOUT: restore quality after interactionIdleMS (interactions without an end event e.g. scroll)"""
+        self.__setResliceInterpolation(self.interactiveInterpolation)
+        self.__setResliceImageCoarse(True)
+        if IDLE_TIMEOUT:
+            if self.interactionIdleTimer is None:
+                from PyQt5.QtCore import QTimer
+                self.interactionIdleTimer = QTimer()
+                self.interactionIdleTimer.setSingleShot(True)
+                self.interactionIdleTimer.timeout.connect(self.__endInteractiveFrame)
+            self.interactionIdleTimer.start(self.interactionIdleMS)
+
+    def __endInteractiveFrame(self):
+        """Redo current frame at full resolution with stillInterpolation"""
+        if self.interactionIdleTimer is not None:
+            self.interactionIdleTimer.stop()
+        CHANGED = self.__setResliceInterpolation(self.stillInterpolation)
+        if self.resliceImageIsCoarse:
+            self.__setResliceImageCoarse(False)
+            CHANGED = True
+        if CHANGED:
+            self.requestRender()
+
+    def __setResliceInterpolation(self, interpolation):
+        """Set interpolation of the reslice of each cursor widget - returns True if changed"""
+        CHANGED = False
+        for iWidget in self.resliceCursorWidgetArray:
+            if iWidget is None:
+                continue
+            reslice = iWidget.GetRepresentation().GetReslice()
+            mode = reslice.GetInterpolationMode()
+            tuiUtils.setResliceInterpolation(reslice, interpolation)
+            CHANGED = CHANGED or (reslice.GetInterpolationMode() != mode)
+        return CHANGED
+
+    def __setResliceImageCoarse(self, COARSE):
+        """Reslice from a coarse pyramid level (if built) while interacting, else full resolution"""
+        if COARSE:
+            levelVTI = self.imagePyramid.getInteractionLevel(self.getCurrentTime(), self.currentArray)
+            if levelVTI is None:
+                return
+            self.resliceCursor.SetImage(levelVTI)
+        else:
+            self.resliceCursor.SetImage(self.displayVTI)
+        self.resliceImageIsCoarse = COARSE
+
+    def __updateDisplayImage(self):
+        """Swap the scalars of the display image to the current timestep (no copy, cursor stays bound)
+        Returns True if the geometry changed (cursor must be re-bound)"""
+        vtiObj = self.getCurrentVTIObject()
+        geometryChanged = not _isSameGeometry(self.displayVTI, vtiObj)
+        if geometryChanged:
+            self.displayVTI.CopyStructure(vtiObj)
+        scalars = vtiObj.GetPointData().GetScalars()
+        if scalars is not self.displayVTI.GetPointData().GetScalars():
+            self.displayVTI.GetPointData().SetScalars(scalars)
+            self.displayVTI.Modified()
+        return geometryChanged
+
+    def __requestImagePyramid(self):
+        """Build coarse levels of current timestep in the background (not during playback)"""
+        if not self.isAnimating:
+            self.imagePyramid.request(self.getCurrentTime(), self.getCurrentVTIObject(), self.currentArray)
 
     # ==================================================================================================================
     #   DATA - 3D specific methods
@@ -430,13 +516,19 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         return tuiUtils.imageX_2_PointID(self.getCurrentVTIObject(), X)
 
     def getIJKAtPtID(self, ptID):
-        return tuiUtils.imageID_2_IJK(self.getCurrentVTIObject(), ptID)
+        return tuiCoordinates.pointIDToIJK(self.getCurrentVTIObject().GetDimensions(), ptID)
+
+    def getVoxelAtX(self, X):
+        """(ijk, pointID) of voxel at X computed from image geometry - None if outside image"""
+        return tuiReadout.voxelAtX(self.getCurrentVTIObject(), X)
 
     def getPixelValueAtX_tuple(self, X):
         ptID = self.getPointIDAtX(X)
         return self.getPixelValueAtPtID_tuple(ptID)
 
-    def mouseXYTo_ImageCS_X(self, mouseX, mouseY):
+    def mouseXYTo_ImageCS_X(self, mouseX, mouseY, PICK=True):
+        """Point on the current reslice plane under the mouse
+        PICK: pick (snaps to nearby points of actors) - else computed from the camera (no pick, for hover readout)"""
         # Can not get direct from interactor - need to go though active cursor widget.
         # Get the current reslice cursor widget
         if self.interactionView >2:
@@ -448,15 +540,21 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         planeSource = rep.GetPlaneSource()
         normal = planeSource.GetNormal()
         origin = planeSource.GetOrigin()
-        plane = vtk.vtkPlane()
-        plane.SetNormal(normal)
-        plane.SetOrigin(origin)
-        picker = vtk.vtkPointPicker()
-        picker.SetTolerance(0.005)
-        picker.Pick(mouseX, mouseY, 0, self.rendererArray[self.interactionView])
-        pickedPoint = picker.GetPickPosition()
+        renderer = self.rendererArray[self.interactionView]
+        if PICK:
+            self.picker.Pick(mouseX, mouseY, 0, renderer)
+            pickedPoint = self.picker.GetPickPosition()
+        else: # Display point at focal plane depth (as vtkPicker does before testing props)
+            renderer.SetWorldPoint(*renderer.GetActiveCamera().GetFocalPoint(), 1.0)
+            renderer.WorldToDisplay()
+            renderer.SetDisplayPoint(mouseX, mouseY, renderer.GetDisplayPoint()[2])
+            renderer.DisplayToWorld()
+            worldPoint = renderer.GetWorldPoint()
+            pickedPoint = [worldPoint[i] / worldPoint[3] for i in range(3)]
+        self.cursorPlane.SetNormal(normal)
+        self.cursorPlane.SetOrigin(origin)
         projectedPoint = [0, 0, 0]
-        plane.ProjectPoint(pickedPoint, origin, normal, projectedPoint)
+        self.cursorPlane.ProjectPoint(pickedPoint, origin, normal, projectedPoint)
         return projectedPoint
 
     def imageCS_to_ResliceCS_X(self, imageCS_X):
@@ -468,23 +566,18 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             1. Convert image coordinates to reslice coordinates
             2. Get IJK coordinates in reslice coordinates
             3. Convert IJK coordinates to world coordinates using PatientMeta
+        imageCS_X may be (3,) - returns None if outside - or (N,3) - rows outside are nan
         """
         worldX_in_reslice = self.imageCS_to_ResliceCS_X(imageCS_X)
-        ijk_in_reslice = self.getIJKAtX(worldX_in_reslice)
-        if ijk_in_reslice is None:
+        X_world, inside = tuiCoordinates.imageXToPatient(self.getCurrentVTIObject(), self.patientMeta, worldX_in_reslice)
+        if np.ndim(inside) == 0 and not inside:
             return None
-        imageCS_ijk = np.array([ijk_in_reslice[0], ijk_in_reslice[1], ijk_in_reslice[2]])
-        return np.array(self.patientMeta.imageToPatientCoordinates(imageCS_ijk))
+        return X_world
 
 
     def worldCS_To_ImageCS_X(self, worldCS_X):
-        """Convert world coordinates to image coordinates"""
-        worldCS_X = np.array(worldCS_X)
-        ijkImage = self.patientMeta.patientToImageCoordinates(worldCS_X.reshape(1,-1))[0]
-        ijkImage = ijkImage.astype(int)
-        id2 = self.getCurrentVTIObject().ComputePointId(ijkImage)
-        xImage = self.getCurrentVTIObject().GetPoint(id2)
-        return xImage
+        """Convert world coordinates to image coordinates - (3,) or (N,3)"""
+        return tuiCoordinates.patientToImageX(self.getCurrentVTIObject(), self.patientMeta, worldCS_X)
 
 
     def getCurrentViewNormal(self): # uses view under mouse
@@ -497,11 +590,18 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
 
 
     def getCurrentReslice(self):
+        self.__flushPendingRender()
         return self.resliceCursorWidgetArray[self.interactionView].GetRepresentation().GetReslice()
 
 
     def getCurrentResliceMatrix(self):
-        return self.resliceCursorWidgetArray[self.interactionView].GetRepresentation().GetReslice().GetResliceAxes()
+        return self.getCurrentReslice().GetResliceAxes()
+
+
+    def __flushPendingRender(self):
+        """Widget reslices are brought up to date by rendering - render now if one is pending"""
+        if (self.renderScheduler is not None) and self.renderScheduler.isPending:
+            self.renderNow()
 
 
     def getCurrentResliceAsVTP(self):
@@ -523,14 +623,18 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
 
 
     def __setupNewImageData(self): # ONLY ON NEW DATA LOAD
-        self.setScalarRangeDictionary()
+        self.setScalarRangeDictionary([self.currentArray])
+        self.imagePyramid.clear()
+        self.resliceImageIsCoarse = False
         ##
         center = self.getCurrentVTIObject().GetCenter()
         self.resliceCursor.SetCenter(center[0], center[1], center[2])
         self.resliceCursor.SetThickMode(0)
         self.resliceCursor.SetThickness(0.01, 0.01, 0.01)
         self.resliceCursor.SetHole(2)
-        self.resliceCursor.SetImage(self.getCurrentVTIObject())
+        self.displayVTI = vtk.vtkImageData()
+        self.__updateDisplayImage()
+        self.resliceCursor.SetImage(self.displayVTI)
         # 2D Reslice cursor widgets
         sR = self.scalarRange[self.currentArray]
         
@@ -567,7 +671,8 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             self.resliceCursorWidgetArray[i].SetRepresentation(rscRep)
             self.resliceCursorWidgetArray[i].SetDefaultRenderer(self.rendererArray[i])
             self.resliceCursorWidgetArray[i].SetEnabled(1)
-            self.resliceCursorWidgetArray[i].GetRepresentation().GetReslice().SetInterpolationModeToLinear()
+            tuiUtils.setResliceInterpolation(self.resliceCursorWidgetArray[i].GetRepresentation().GetReslice(),
+                                             self.stillInterpolation)
             self.resliceCursorWidgetArray[i].AddObserver('StartInteractionEvent', self.ResliceCursorStartCallback)
             self.resliceCursorWidgetArray[i].AddObserver('InteractionEvent', self.ResliceCursorCallback)
             self.resliceCursorWidgetArray[i].AddObserver('EndInteractionEvent', self.ResliceCursorEndCallback)
@@ -578,16 +683,14 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         for i in range(4):
             self.rendererArray[i].SetBackground(self.planeBackgroundColors[i])
         # 3D
-        dims = [0,0,0]
-        self.getCurrentVTIObject().GetDimensions(dims)
         try:
-            if np.prod(dims) < 60e+6: # For very large data - don't want to do this
-                logger.info("Working with current array: %s", self.currentArray)
-                A = vtkfilters.getArrayAsNumpy(self.getCurrentVTIObject(), self.currentArray)
-                A[np.isnan(A)] = 0.0
-                A = A[A>1.0]
-                contourVal = np.mean(A) * 2.0
-                logger.info("Made contour at value: %d", int(contourVal))
+            logger.info("Working with current array: %s", self.currentArray)
+            # Mean of values > 1 estimated from a voxel sample (any data size, data not modified)
+            meanAbove = self.arrayStats.getMeanAbove(self.getCurrentVTIObject(), self.getCurrentTime(),
+                                                     self.currentArray, 1.0)
+            if meanAbove is not None:
+                contourVal = meanAbove[0] * 2.0
+                logger.info("Made contour at value: %d (+/- %.1f)", int(contourVal), 2.0 * meanAbove[1])
                 self.setContourVal(contourVal)
         except Exception as e:
             logger.error("Error setting contour value: %s", e)
@@ -604,9 +707,11 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         if len(iTimes) == len(self.times):
             for k1 in range(len(self.times)):
                 thisPP = polyDataDict[iTimes[k1]]
-                for iPt in vtkfilters.getPtsAsNumpy(thisPP):
-                    X_world = iPt
-                    X_image = self.worldCS_To_ImageCS_X(X_world)
+                X_worldArray = vtkfilters.getPtsAsNumpy(thisPP)
+                if len(X_worldArray) == 0:
+                    continue
+                X_imageArray = self.worldCS_To_ImageCS_X(X_worldArray)
+                for X_world, X_image in zip(X_worldArray, X_imageArray):
                     norm = None # Possible it exists... 
                     self.Markups.addPoint(X_image, X_world, k1, None, norm, None, ptColour=(1,1,0), ptSize=0.014)
         self._updateMarkups(ptSizeFactor=1.0)
@@ -614,12 +719,16 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
 
     # ======================== RENDERING ===============================================================================
     def updateViewAfterTimeChange(self): # NEED TO TRIGGER ON A TIME CHANGE
-        self.resliceCursor.SetImage(self.getCurrentVTIObject()) # FIXME - check the picker
+        geometryChanged = self.__updateDisplayImage()
+        if geometryChanged or self.resliceImageIsCoarse:
+            self.resliceCursor.SetImage(self.displayVTI)
+        self.resliceImageIsCoarse = False
+        self.__requestImagePyramid()
         self.updateViewAfterSliceChange()
     
     def updateViewAfterSliceChange(self):
         """Update view after slice change for 3D viewer"""
-        self.renderWindow.Render()
+        self.requestRender()
 
     def updateAllActorsToCurrentSlice(self):
         """
@@ -670,30 +779,27 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         if (not all(tfA)) or (not all(tfB)):
             SHOW_LINES = False
 
-        ptsActor = self.Markups.getAllPointsActors(self.currentTimeID, pointSize)
-        if ptsActor is not None:
-            # We add to 3D and then only to other views if all points within 2 delta X of slice
-            self.rendererArray[3].AddActor(ptsActor)
-            self.markupActorList.append(ptsActor)
-            if SHOW_LINES:
-                lineWidth = 3 if self.markupMode == 'Spline' else pointSize*0.9
-                lineActor = self.Markups.getAllPointsLineActor(self.currentTimeID, lineWidth, LOOP)
+        # All points in 3D and only points within pointSize*0.9 of slice in other views (masked, not rebuilt)
+        nPtsShown = self.Markups.updatePointsLayer(self.pointGlyphLayers[3], self.currentTimeID, pointSize)
+        if (nPtsShown > 0) and SHOW_LINES:
+            lineWidth = 3 if self.markupMode == 'Spline' else pointSize*0.9
+            lineActor = self.Markups.getAllPointsLineActor(self.currentTimeID, lineWidth, LOOP)
+            if lineActor is not None:
                 self.rendererArray[3].AddActor(lineActor)
                 self.markupActorList.append(lineActor)
-            cpX = self.resliceCursor.GetCenter()
-            for i in range(3):
-                nn = self.getViewNormal(i)
-                # Use the same zoom-adjusted point size for individual views
-                ptsActor_i = self.Markups.getAllPointsActors(self.currentTimeID, pointSize, cpX, nn, pointSize*0.9)
-                if ptsActor_i is not None:
-                    self.rendererArray[i].AddActor(ptsActor_i)
-                    self.markupActorList.append(ptsActor_i)
-                    if SHOW_LINES:
-                        lineWidth = 3
-                        lineActor_i = self.Markups.getAllPointsLineActor(self.currentTimeID, lineWidth, LOOP, cpX, nn, pointSize*0.9)
-                        if lineActor_i is not None:
-                            self.rendererArray[i].AddActor(lineActor_i)
-                            self.markupActorList.append(lineActor_i)
+        # Slice proximity of all points for the three views in one go - masks shared by point and line layers
+        cpX = self.resliceCursor.GetCenter()
+        viewNormals = [self.getViewNormal(i) for i in range(3)]
+        sliceMasks = self.Markups.getPointsWithinBoundsMask(self.currentTimeID, cpX, viewNormals, pointSize*0.9)
+        for i in range(3):
+            # Use the same zoom-adjusted point size for individual views
+            nPtsShown_i = self.Markups.updatePointsLayer(self.pointGlyphLayers[i], self.currentTimeID, pointSize, mask=sliceMasks[i])
+            if (nPtsShown_i > 0) and SHOW_LINES:
+                lineWidth = 3
+                lineActor_i = self.Markups.getAllPointsLineActor(self.currentTimeID, lineWidth, LOOP, mask=sliceMasks[i])
+                if lineActor_i is not None:
+                    self.rendererArray[i].AddActor(lineActor_i)
+                    self.markupActorList.append(lineActor_i)
         ## POLYDATA
         pdActors = self.Markups.getAllPolydataActors(self.currentTimeID)
         if len(pdActors) > 0:
@@ -705,7 +811,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
         if (window is not None) and (level is not None):
             logger.info("UpdateMarkups: Setting window level: window=%.2f, level=%.2f", window, level)
             self.setWindowLevel(window, level)
-        self.renderWindow.Render()
+        self.requestRender()
 
     def __updateCrosshairs(self, SHOW):
         for i in range(3):
@@ -714,7 +820,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
                 self.rendererArray[i].AddActor(iActor)
             else:
                 self.rendererArray[i].RemoveActor(iActor)
-        self.renderWindow.Render()
+        self.requestRender()
 
 
     def __update3DCursor(self, SHOW):
@@ -723,7 +829,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             self.rendererArray[3].AddActor(iActor)
         else:
             self.rendererArray[3].RemoveActor(iActor)
-        self.renderWindow.Render()
+        self.requestRender()
 
     def __update3DSurfaceView(self):
         self.rendererArray[3].RemoveActor(self.threeDContourActor)
@@ -731,7 +837,7 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
             cc, ccActor = self.__get3DContourActor()
             self.threeDContourActor = ccActor
             self.rendererArray[3].AddActor(self.threeDContourActor)
-        self.renderWindow.Render()
+        self.requestRender()
 
     def __get3DContourActor(self):
         cc = self.getCurrentContourPolydata()
@@ -757,11 +863,9 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
                                   FULL_VIEW=FULL_VIEW, size=size)
 
     def __saveImages(self, outputDir, startPt, endPt, nImages, viewID, outputPrefix='', FULL_VIEW=False, size=None):
-        from PIL import Image
         fileOutList = []
         w, l = self.getWindowLevel(viewID)
         logger.info("Running saveImages - w=%s, l=%s", w, l)
-        lowP, highP = l-(w/2.), l+(w/2.)
         imageLine = vtkfilters.buildPolyLineBetweenTwoPoints(startPt, endPt, nImages)
         allCP = vtkfilters.getPtsAsNumpy(imageLine)
         
@@ -789,7 +893,8 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
                 camera.SetPosition(cp[0], cp[1], cp[2])
                 camera.Modified()
             
-            self._updateMarkups(w, l)  # will render
+            self._updateMarkups(w, l)
+            self.renderNow() # Reslice output / window captured below
             fOut = os.path.join(outputDir, f'{outputPrefix}{k1}.png')
             if FULL_VIEW:
                 windowToImageFilter = vtk.vtkWindowToImageFilter()
@@ -801,27 +906,8 @@ class TUIMarkupViewer(tuimarkupui.QtWidgets.QMainWindow, tuimarkupui.Ui_BASEUI,
                 writer.Write()
             else:
                 ii = self.getCurrentResliceAsVTI(COPY=True)
-                dims = ii.GetDimensions()
-                A = vtkfilters.getArrayAsNumpy(ii, 'ImageScalars')
-                A[A < lowP] = lowP
-                A[A > highP] = highP
-                A = A + abs(np.min(A)) # Max all pixels positive
-                A = (A / np.max(A) * 255) # Set to 0-255
-                A = np.reshape(A, (dims[0], dims[1]), order='F')
-                A = np.rot90(A, 1) # FIXME - should work out this number from viewID
-                img = Image.fromarray(A.astype(np.uint8))  # uses mode='L'
-                if size is not None:
-                    try: 
-                        size[1] 
-                    except (TypeError, IndexError): 
-                        size = [size, size]
-                    wh = img.size
-                    whMaxID = np.argmax(wh)
-                    ratios = [wh[0] / wh[whMaxID], wh[1] / wh[whMaxID]]
-                    if wh[whMaxID] > max(size):
-                        sizeN = [size[0] * ratios[0], size[1] * ratios[1]]
-                        img = img.resize((int(sizeN[0]), int(sizeN[1])))
-                img.save(fOut)
+                A = tuiExport.sliceToUint8(ii, w, l, 'ImageScalars') # FIXME - rotation should be worked out from viewID
+                tuiExport.writePNG(A, fOut, size)
             fileOutList.append(fOut)
         return fileOutList
         # os.system('convert %s -resize 400x400 %s'%(fOut, fOut))
@@ -862,6 +948,15 @@ def probeDataWithPt(vtkObj, vtkPolyPt, arrayName):
     probeF.Update()
     return probeF.GetOutput().GetPointData().GetArray(arrayName).GetTuple(0)
 
+def _isSameGeometry(vtiA, vtiB):
+    """True if two vtkImageData share dimensions, spacing, origin and direction"""
+    if vtiA.GetDimensions() != vtiB.GetDimensions():
+        return False
+    if not np.allclose(vtiA.GetSpacing(), vtiB.GetSpacing()) or not np.allclose(vtiA.GetOrigin(), vtiB.GetOrigin()):
+        return False
+    dA, dB = vtiA.GetDirectionMatrix(), vtiB.GetDirectionMatrix()
+    return all([dA.GetElement(i, j) == dB.GetElement(i, j) for i in range(3) for j in range(3)])
+
 def getClosestInSortedList(listIn, ref):
     for k1 in range(0, len(listIn)):
         if listIn[k1] > ref: